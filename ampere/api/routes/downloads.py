@@ -3,7 +3,7 @@ from pydantic import TypeAdapter
 
 from ampere.api.limiter import limiter
 from ampere.cli.common import CLIEnvironment
-from ampere.common import get_frontend_db_con
+from ampere.common import get_frontend_parquet_con
 from ampere.models import (
     DownloadPublic,
     DownloadsGranularity,
@@ -20,7 +20,7 @@ router = APIRouter(prefix="/downloads", tags=["downloads"])
 def get_downloads_base(
     table_name: str, config: GetDownloadsPublicConfig
 ) -> DownloadsPublic:
-    con = get_frontend_db_con()
+    con = get_frontend_parquet_con()
     valid_repos = create_repo_enum(CLIEnvironment.dev, True)
     try:
         repo = valid_repos(config.repo)  # type: ignore
@@ -140,7 +140,7 @@ def read_downloads_monthly(
 @router.get("/repos", response_model=ReposWithDownloads)
 @limiter.limit("60/minute")
 def read_repos_with_downloads(request: Request) -> ReposWithDownloads:
-    con = get_frontend_db_con()
+    con = get_frontend_parquet_con()
     query = """
         select distinct a.repo 
         from mart_downloads_summary a 
@@ -8,7 +8,7 @@ from pydantic import TypeAdapter
 
 from ampere.api.limiter import limiter
 from ampere.cli.common import CLIEnvironment
-from ampere.common import get_frontend_db_con
+from ampere.common import get_frontend_parquet_con
 from ampere.models import (
     FeedBounds,
     FeedPublic,
@@ -68,7 +68,7 @@ def get_feed_bounds(
     action: FeedPublicAction | None = None,
     username: str | None = None,
 ):
-    con = get_frontend_db_con()
+    con = get_frontend_parquet_con()
 
     repo_name = "'overall'" if repo is None else "repo_name"
     event_type = "'overall'" if event is None else "event_type"
@@ -113,7 +113,7 @@ def read_feed(
     limit: int = Query(default=50, le=10_000),
     descending: bool = Query(default=True),
 ) -> FeedPublic:
-    con = get_frontend_db_con()
+    con = get_frontend_parquet_con()
     sort_order = "desc" if descending else "asc"
     params = []
 
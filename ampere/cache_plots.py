@@ -1,7 +1,6 @@
 import pickle
-import random
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 import networkx as nx
 import pandas as pd
@@ -10,6 +9,7 @@ from plotly.graph_objs import Figure
 from ampere.cli.common import CLIEnvironment
 from ampere.common import get_backend_db_con, timeit
 from ampere.models import Followers, StargazerNetworkRecord, get_repos_with_downloads
+from ampere.network_layout import incremental_spring_layout
 from ampere.styling import ScreenWidth
 from ampere.viz import (
     get_downloads_data,
@@ -40,6 +40,15 @@ def dump_obj_to_pickle(pkl_name: str, obj: Any):
         pickle.dump(obj, f)
 
 
+def load_obj_from_pickle(pkl_name: str) -> Optional[Any]:
+    in_path = Path(__file__).parents[1] / "data" / "viz" / f"{pkl_name}.pkl"
+    if not in_path.exists():
+        return None
+
+    with in_path.open("rb") as f:
+        return pickle.load(f)
+
+
 def dump_fig_to_json(f_name: str, fig: Figure):
     out_dir = Path(__file__).parents[1] / "data" / "viz"
     out_dir.mkdir(exist_ok=True, parents=True)
@@ -62,20 +71,10 @@ def create_follower_network() -> None:
     )
     followers = list(Followers(**record) for record in followers)  # type: ignore
 
-    random.seed(42)
-    added_nodes = []
+    # nodes are added in first-seen order as edges reference them
     graph = nx.Graph()
-    for record in followers:
-        if record.user_id not in added_nodes:
-            graph.add_node(record.user_id)
-            added_nodes.append(record.user_id)
-
-        if record.follower_id not in added_nodes:
-            graph.add_node(record.follower_id)
-            added_nodes.append(record.follower_id)
-
-        graph.add_edge(record.user_id, record.follower_id, weight=0.03)
-    pos = nx.spring_layout(graph)
+    graph.add_edges_from(((i.user_id, i.follower_id) for i in followers), weight=0.03)
+    pos = incremental_spring_layout(graph, load_obj_from_pickle("follower_network"))
     nx.set_node_attributes(graph, pos, "pos")
 
     dump_obj_to_pickle("follower_network", graph)
@@ -162,7 +161,6 @@ def create_stargazer_network() -> None:
     repos_with_stargazers = list(set(i.repo_name for i in stargazers))
 
     print("creating star network...")
-    random.seed(42)
     added_repos = []
     current_user = stargazers[0].user_name
 
@@ -192,7 +190,7 @@ def create_stargazer_network() -> None:
         added_repos.append(record.repo_name)
         current_user = record.user_name
 
-    pos = nx.spring_layout(graph)
+    pos = incremental_spring_layout(graph, load_obj_from_pickle("star_network"))
     nx.set_node_attributes(graph, pos, "pos")
 
     dump_obj_to_pickle("star_network", graph)
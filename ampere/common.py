@@ -1,22 +1,29 @@
 import datetime
+import itertools
 import json
 import os
+import random
+import threading
 import time
+import uuid
 from dataclasses import dataclass
 from enum import StrEnum, auto
-from functools import wraps
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Any, Callable, Optional, TypeVar
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
 
 import duckdb
 import pandas as pd
 import polars as pl
-from deltalake import DeltaTable, write_deltalake
+import pyarrow as pa
+from deltalake import CommitProperties, DeltaTable, write_deltalake
+from deltalake.exceptions import CommitFailedError, DeltaError
 from duckdb import DuckDBPyConnection
 from sqlmodel import SQLModel
 from sqlmodel.main import SQLModelMetaclass
 
 SQLModelType = TypeVar("SQLModelType", bound=SQLModel)
+T = TypeVar("T")
 
 
 @dataclass
@@ -38,6 +45,8 @@ class DeltaWriteConfig:
     table_name: str
     pks: list[str]
     mode: DeltaTableWriteMode
+    max_commit_retries: int = 5
+    retry_base_delay_seconds: float = 0.5
 
 
 def format_list_sql_query(input_list: list[str]) -> str:
@@ -73,39 +82,87 @@ def get_current_time() -> datetime.datetime:
     return datetime.datetime.now(datetime.timezone.utc)
 
 
-def write_delta_table(
-    records: list[SQLModelType] | pd.DataFrame | pl.DataFrame,
-    config: DeltaWriteConfig,
-    cleanup: bool = True,
+def is_delta_commit_conflict(e: Exception) -> bool:
+    if isinstance(e, CommitFailedError):
+        return True
+
+    # concurrent writers racing to create the same table both try to commit version 0
+    message = str(e).lower()
+    return isinstance(e, DeltaError) and (
+        "already exists" in message or "version already exists" in message
+    )
+
+
+def retry_delta_commit(
+    write_func: Callable[[], T],
+    max_retries: int = 5,
+    base_delay_seconds: float = 0.5,
+) -> T:
+    """
+    retries `write_func` with jittered exponential backoff when the delta commit
+    conflicts with a concurrent writer. `write_func` must reload the table state
+    on every call so each attempt is planned against the latest version
+    """
+    attempt = 0
+    while True:
+        try:
+            return write_func()
+        except Exception as e:
+            if not is_delta_commit_conflict(e) or attempt >= max_retries:
+                raise
+
+            delay = base_delay_seconds * (2**attempt) * random.uniform(0.5, 1.5)
+            attempt += 1
+            print(
+                f"commit conflict ({type(e).__name__}) - "
+                f"retry {attempt}/{max_retries} in {delay:.2f}s"
+            )
+            time.sleep(delay)
+
+
+def commit_delta_write(
+    df: pd.DataFrame, table_path: Path, config: DeltaWriteConfig, write_id: str
 ) -> None:
-    data_dir = Path(__file__).parents[1] / "data" / config.table_dir
-    table_path = data_dir / config.table_name
-    if isinstance(records, pd.DataFrame):
-        df = records
-    elif isinstance(records, pl.DataFrame):
-        df = records.to_pandas(use_pyarrow_extension_array=True)
-    else:
-        df = pd.DataFrame.from_records([i.model_dump() for i in records])
+    # appends never read existing files, so delta-rs can rebase them onto
+    # any concurrently committed version without rewriting data
+    commit_properties = CommitProperties(
+        custom_metadata={"ampere_write_id": write_id},
+        max_commit_retries=config.max_commit_retries,
+    )
 
     delta_log_dir = table_path / "_delta_log"
-    print(f"writing {len(records)} to {table_path}...")
     if not delta_log_dir.exists():
         table_path.mkdir(exist_ok=True, parents=True)
-        write_deltalake(table_path, df, mode="error")
+        write_deltalake(table_path, df, mode="error", commit_properties=commit_properties)
         return
 
     if config.mode == DeltaTableWriteMode.APPEND:
-        write_deltalake(table_path, df, mode="append")
+        # ledgers gain columns over time, so appends may add new nullable fields
+        write_deltalake(
+            table_path,
+            df,
+            mode="append",
+            schema_mode="merge",
+            commit_properties=commit_properties,
+        )
         print("append complete")
         return
 
     elif config.mode == DeltaTableWriteMode.OVERWRITE:
-        write_deltalake(table_path, df, mode="overwrite")
+        write_deltalake(
+            table_path, df, mode="overwrite", commit_properties=commit_properties
+        )
         print("overwrite complete")
         return
 
     elif config.mode == DeltaTableWriteMode.OVERWRITE_WITH_SCHEMA:
-        write_deltalake(table_path, df, mode="overwrite", schema_mode="overwrite")
+        write_deltalake(
+            table_path,
+            df,
+            mode="overwrite",
+            schema_mode="overwrite",
+            commit_properties=commit_properties,
+        )
         print("overwrite (including table schema) complete")
         return
 
@@ -117,6 +174,7 @@ def write_delta_table(
             predicate=predicate_str,
             source_alias="s",
             target_alias="t",
+            commit_properties=commit_properties,
         )
         .when_matched_update_all()
         .when_not_matched_insert_all()
@@ -124,8 +182,173 @@ def write_delta_table(
     )
     print(merge_results)
 
+
+def get_delta_write_version(table_path: Path, write_id: str) -> Optional[int]:
+    # concurrent writers may have committed after us, so match on our write id
+    # instead of assuming the latest version is ours
+    for commit in DeltaTable(str(table_path)).history(limit=100):
+        if commit.get("ampere_write_id") == write_id:
+            return commit["version"]
+    return None
+
+
+def record_delta_table_version(
+    config: DeltaWriteConfig, version: Optional[int], n_records: int
+) -> None:
+    from ampere.models import DeltaTableVersion
+
+    ledger_name = str(DeltaTableVersion.__tablename__)
+    if (
+        version is None
+        or config.table_dir != "bronze"
+        or config.table_name == ledger_name
+    ):
+        return
+
+    record = DeltaTableVersion(
+        table_name=config.table_name,
+        version=version,
+        n_records=n_records,
+        written_at=get_current_time(),
+    )
+
+    write_delta_table(
+        [record],
+        DeltaWriteConfig(
+            table_dir="bronze",
+            table_name=ledger_name,
+            pks=get_model_primary_key(DeltaTableVersion),
+            mode=DeltaTableWriteMode.APPEND,
+        ),
+        cleanup=False,
+    )
+
+
+def read_delta_table_last_written() -> dict[str, datetime.datetime]:
+    """
+    latest write time of each bronze table recorded in the `delta_table_versions` ledger
+    """
+    from ampere.models import DeltaTableVersion
+
+    table_path = (
+        Path(__file__).parents[1]
+        / "data"
+        / "bronze"
+        / str(DeltaTableVersion.__tablename__)
+    )
+    if not (table_path / "_delta_log").exists():
+        return {}
+
+    last_written = (
+        DeltaTable(str(table_path))
+        .to_pyarrow_table(columns=["table_name", "written_at"])
+        .group_by("table_name")
+        .aggregate([("written_at", "max")])
+    )
+    return dict(
+        zip(
+            last_written["table_name"].to_pylist(),
+            last_written["written_at_max"].to_pylist(),
+        )
+    )
+
+
+def write_delta_table(
+    records: list[SQLModelType] | pd.DataFrame | pl.DataFrame,
+    config: DeltaWriteConfig,
+    cleanup: bool = True,
+) -> Optional[int]:
+    """
+    writes records to the delta table described by `config` and returns the table
+    version produced by the write. bronze writes are also recorded in the
+    `delta_table_versions` ledger for incremental consumers. unless `cleanup` is
+    off the table is then compacted and vacuumed, whatever the write mode
+    """
+    data_dir = Path(__file__).parents[1] / "data" / config.table_dir
+    table_path = data_dir / config.table_name
+    if isinstance(records, pd.DataFrame):
+        df = records
+    elif isinstance(records, pl.DataFrame):
+        df = records.to_pandas(use_pyarrow_extension_array=True)
+    else:
+        df = pd.DataFrame.from_records([i.model_dump() for i in records])
+
+    print(f"writing {len(records)} to {table_path}...")
+    write_id = str(uuid.uuid4())
+    retry_delta_commit(
+        lambda: commit_delta_write(df, table_path, config, write_id),
+        config.max_commit_retries,
+        config.retry_base_delay_seconds,
+    )
+
+    version = get_delta_write_version(table_path, write_id)
+    record_delta_table_version(config, version, len(df))
+
     if cleanup:
-        cleanup_delta_table(table_path)
+        # the write has already committed, so a cleanup that keeps conflicting with
+        # concurrent writers is left to the next write instead of failing this one
+        try:
+            retry_delta_commit(
+                lambda: cleanup_delta_table(table_path),
+                config.max_commit_retries,
+                config.retry_base_delay_seconds,
+            )
+        except DeltaError as e:
+            print(f"skipping cleanup of {table_path} - {type(e).__name__}: {e}")
+
+    return version
+
+
+def write_delta_batches(
+    batches: Iterable[pa.RecordBatch],
+    config: DeltaWriteConfig,
+) -> int:
+    """
+    streams arrow record batches into an append-only delta table as a single commit.
+    memory is bounded by the batch size instead of the full result set.
+    returns the number of records written
+    """
+    if config.mode != DeltaTableWriteMode.APPEND:
+        raise ValueError("streaming writes only support `DeltaTableWriteMode.APPEND`")
+
+    table_path = Path(__file__).parents[1] / "data" / config.table_dir / config.table_name
+
+    non_empty_batches = (i for i in batches if i.num_rows > 0)
+    first_batch = next(non_empty_batches, None)
+    if first_batch is None:
+        print(f"no records to write to {table_path}")
+        return 0
+
+    n_records = 0
+
+    def count_batches() -> Iterator[pa.RecordBatch]:
+        nonlocal n_records
+        for batch in itertools.chain([first_batch], non_empty_batches):
+            n_records += batch.num_rows
+            yield batch
+
+    reader = pa.RecordBatchReader.from_batches(first_batch.schema, count_batches())
+
+    print(f"streaming records to {table_path}...")
+    table_path.mkdir(exist_ok=True, parents=True)
+    write_id = str(uuid.uuid4())
+
+    # the batch stream can't be replayed, so commit conflicts are only resolved by
+    # delta-rs rebasing the append rather than by `retry_delta_commit`
+    write_deltalake(
+        table_path,
+        reader,
+        mode="append",
+        commit_properties=CommitProperties(
+            custom_metadata={"ampere_write_id": write_id},
+            max_commit_retries=config.max_commit_retries,
+        ),
+    )
+    print(f"append complete - {n_records} records")
+
+    version = get_delta_write_version(table_path, write_id)
+    record_delta_table_version(config, version, n_records)
+    return n_records
 
 
 def get_model_primary_key(model: SQLModelMetaclass) -> list[str]:
@@ -154,6 +377,50 @@ def get_frontend_db_con(read_only: bool = True) -> DuckDBPyConnection:
     )
 
 
+def get_frontend_parquet_dir() -> Path:
+    return Path(__file__).parents[1] / "data" / "frontend_parquet"
+
+
+PARQUET_SERVING_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=2)
+def get_parquet_serving_db(generation_dir: Path) -> DuckDBPyConnection:
+    """
+    an in-memory database per process and parquet generation, holding only a view
+    per exported mart. parquet reads go through the os page cache shared by every
+    worker process rather than a buffer pool of their own
+    """
+    con = duckdb.connect(config={"TimeZone": "UTC"})
+    con.sql("set parquet_metadata_cache = true")
+    has_external_file_cache = con.sql(
+        "select count(*) from duckdb_settings() where name = 'enable_external_file_cache'"
+    ).fetchall()[0][0]
+    if has_external_file_cache:
+        con.sql("set enable_external_file_cache = false")
+
+    for parquet_path in sorted(generation_dir.glob("*.parquet")):
+        con.sql(
+            f"create view {parquet_path.stem} as "
+            f"select * from read_parquet('{parquet_path}')"
+        )
+    return con
+
+
+def get_frontend_parquet_con() -> DuckDBPyConnection:
+    """
+    read connection over the published parquet generation of the served marts, with
+    filters pushed down to row group statistics. falls back to `frontend.duckdb`
+    until the mirror has exported a generation
+    """
+    current_dir = get_frontend_parquet_dir() / "current"
+    if not current_dir.exists():
+        return get_frontend_db_con()
+
+    with PARQUET_SERVING_LOCK:
+        return get_parquet_serving_db(current_dir.resolve()).cursor()
+
+
 def get_backend_db_con(read_only: bool = True) -> DuckDBPyConnection:
     db_path = Path(__file__).parents[1] / "data" / "backend.duckdb"
     return duckdb.connect(
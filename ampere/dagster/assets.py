@@ -1,8 +1,10 @@
+import json
 import time
-from typing import Any
+from typing import Any, Optional
 
-from dagster import AssetExecutionContext, asset
-from dagster_dbt import DbtCliResource, dbt_assets
+from dagster import AssetExecutionContext, Config, EventLogEntry, asset
+from dagster._core.definitions.data_version import CODE_VERSION_TAG
+from dagster_dbt import DagsterDbtTranslator, DbtCliInvocation, DbtCliResource, dbt_assets
 
 from ampere.cache_plots import (
     cache_downloads_plots,
@@ -17,8 +19,14 @@ from ampere.common import (
     DeltaWriteConfig,
     get_backend_db_con,
     get_model_primary_key,
+    read_delta_table_last_written,
     write_delta_table,
 )
+from ampere.dbt_timings import (
+    get_dbt_timing_regressions,
+    parse_dbt_run_results,
+    write_dbt_model_timings,
+)
 from ampere.get_pypi_downloads import (
     refresh_all_pypi_downloads,
 )
@@ -37,9 +45,16 @@ from ampere.get_repo_metrics import (
     refresh_github_table,
     refresh_users,
 )
-from ampere.mirror import copy_backend_to_frontend
+from ampere.mirror import (
+    DOWNLOADS_TABLES,
+    GITHUB_TABLES,
+    STATUS_TABLES,
+    MirroredTable,
+    copy_backend_to_frontend,
+)
 from ampere.models import (
     Commit,
+    DbtModelTiming,
     Follower,
     Fork,
     Issue,
@@ -56,9 +71,216 @@ db_path = ampere_project.project_dir.joinpath("data/backend.duckdb")
 
 
 # DBT
+# set this run tag to "true" to build every selected dbt model regardless of state
+DBT_FULL_BUILD_TAG = "ampere/dbt_full_build"
+
+
+def get_dbt_stale_reasons(context: AssetExecutionContext) -> dict[str, Optional[str]]:
+    """
+    maps each selected dbt model to the reason it needs rebuilding, or None. a model
+    is stale when it has never been materialized, its sql changed, it is older than
+    its `meta.ampere.max_age_hours`, or a bronze table or model it depends on was
+    written after its last materialization. bronze writes are compared against the
+    start of the materializing run, since the incremental scan ignores commits
+    made after `run_started_at`. the timings table is left out since every build
+    writes it, see `get_dbt_timing_models`
+    """
+    manifest = json.loads(ampere_project.manifest_path.read_text())
+    sources = manifest["sources"]
+    parent_map = manifest["parent_map"]
+    nodes = {
+        k: v
+        for k, v in manifest["nodes"].items()
+        if v["resource_type"] in ("model", "seed", "snapshot")
+    }
+
+    translator = DagsterDbtTranslator()
+    asset_keys = {k: translator.get_asset_key(v) for k, v in nodes.items()}
+    selected_ids = {k for k, v in asset_keys.items() if v in context.selected_asset_keys}
+    code_versions = context.assets_def.code_versions_by_key
+    last_written = {k: v.timestamp() for k, v in read_delta_table_last_written().items()}
+
+    events: dict[str, Optional[EventLogEntry]] = {}
+    run_start_times: dict[str, float] = {}
+    reasons: dict[str, Optional[str]] = {}
+
+    def get_last_materialization(unique_id: str) -> Optional[EventLogEntry]:
+        if unique_id not in events:
+            events[unique_id] = context.instance.get_latest_materialization_event(
+                asset_keys[unique_id]
+            )
+        return events[unique_id]
+
+    def get_run_start_time(event: EventLogEntry) -> float:
+        if event.run_id not in run_start_times:
+            start_time = context.instance.get_run_stats(event.run_id).start_time
+            run_start_times[event.run_id] = (
+                event.timestamp if start_time is None else start_time
+            )
+        return run_start_times[event.run_id]
+
+    def get_stale_reason(unique_id: str) -> Optional[str]:
+        if unique_id in reasons:
+            return reasons[unique_id]
+
+        reasons[unique_id] = None
+        event = get_last_materialization(unique_id)
+        if event is None or event.asset_materialization is None:
+            reasons[unique_id] = "never materialized"
+            return reasons[unique_id]
+
+        materialized_at = event.timestamp
+        code_version = event.asset_materialization.tags.get(CODE_VERSION_TAG)
+        if code_version != code_versions.get(asset_keys[unique_id]):
+            reasons[unique_id] = "sql changed"
+            return reasons[unique_id]
+
+        max_age_hours = nodes[unique_id]["meta"].get("ampere", {}).get("max_age_hours")
+        if (
+            max_age_hours is not None
+            and time.time() - materialized_at > max_age_hours * 3600
+        ):
+            reasons[unique_id] = f"older than {max_age_hours} hours"
+            return reasons[unique_id]
+
+        for parent_id in parent_map.get(unique_id, []):
+            if parent_id in sources:
+                table_name = sources[parent_id]["identifier"]
+                if table_name == DbtModelTiming.__tablename__:
+                    continue
+                if last_written.get(table_name, 0) > get_run_start_time(event):
+                    reasons[unique_id] = f"{table_name} was written"
+                    break
+            elif parent_id in nodes:
+                parent_name = nodes[parent_id]["name"]
+                if parent_id in selected_ids and get_stale_reason(parent_id):
+                    reasons[unique_id] = f"{parent_name} is stale"
+                    break
+
+                parent_event = get_last_materialization(parent_id)
+                if parent_event is not None and parent_event.timestamp > materialized_at:
+                    reasons[unique_id] = f"{parent_name} was rebuilt"
+                    break
+
+        return reasons[unique_id]
+
+    return {nodes[i]["name"]: get_stale_reason(i) for i in sorted(selected_ids)}
+
+
+def get_dbt_timing_models(context: AssetExecutionContext) -> tuple[list[str], list[str]]:
+    """
+    splits the dbt models into the selected ones built from the timings table and
+    every other model. timings are written after a build finishes, so the timing
+    models are built in a second invocation to report on the run they are part of
+    """
+    manifest = json.loads(ampere_project.manifest_path.read_text())
+    child_map = manifest["child_map"]
+    nodes = {k: v for k, v in manifest["nodes"].items() if v["resource_type"] == "model"}
+
+    timing_ids: set[str] = set()
+    pending = [
+        k
+        for k, v in manifest["sources"].items()
+        if v["identifier"] == DbtModelTiming.__tablename__
+    ]
+    while pending:
+        for child_id in child_map.get(pending.pop(), []):
+            if child_id in nodes and child_id not in timing_ids:
+                timing_ids.add(child_id)
+                pending.append(child_id)
+
+    translator = DagsterDbtTranslator()
+    timing_models = [
+        nodes[i]["name"]
+        for i in sorted(timing_ids)
+        if translator.get_asset_key(nodes[i]) in context.selected_asset_keys
+    ]
+    other_models = [v["name"] for k, v in sorted(nodes.items()) if k not in timing_ids]
+    return timing_models, other_models
+
+
+def record_dbt_model_timings(
+    context: AssetExecutionContext, dbt_invocation: DbtCliInvocation
+) -> None:
+    if not (dbt_invocation.target_path / "run_results.json").exists():
+        context.log.warning("dbt did not write run_results.json, skipping timings")
+        return
+
+    run_results = dbt_invocation.get_artifact("run_results.json")
+    write_dbt_model_timings(parse_dbt_run_results(run_results, context.run_id))
+
+
 @dbt_assets(manifest=ampere_project.manifest_path)
 def ampere_dbt_assets(context: AssetExecutionContext, dbt: DbtCliResource) -> Any:
-    yield from dbt.cli(["build"], context=context).stream()
+    timing_models, other_models = get_dbt_timing_models(context)
+
+    # dagster-dbt adds the run's asset selection to the command, so narrowing it
+    # down to stale models has to go through --exclude
+    dbt_args = ["build", "--exclude", *timing_models] if timing_models else ["build"]
+    build_models = True
+    build_timing_models = bool(timing_models)
+    if context.run.tags.get(DBT_FULL_BUILD_TAG) != "true":
+        stale_reasons = get_dbt_stale_reasons(context)
+        stale_models = {k: v for k, v in stale_reasons.items() if v is not None}
+        if not stale_models:
+            context.log.info("no selected dbt models are stale, skipping dbt build")
+            return
+
+        for model_name, reason in stale_models.items():
+            context.log.info(f"rebuilding {model_name}: {reason}")
+
+        build_models = any(i not in timing_models for i in stale_models)
+        fresh_models = [
+            k for k, v in stale_reasons.items() if v is None and k not in timing_models
+        ]
+        if fresh_models:
+            dbt_args.extend(["--exclude", *fresh_models])
+
+    if build_models:
+        dbt_invocation = dbt.cli(dbt_args, context=context)
+        try:
+            yield from dbt_invocation.stream()
+        finally:
+            record_dbt_model_timings(context, dbt_invocation)
+
+    if build_timing_models:
+        dbt_invocation = dbt.cli(["build", "--exclude", *other_models], context=context)
+        try:
+            yield from dbt_invocation.stream()
+        finally:
+            record_dbt_model_timings(context, dbt_invocation)
+
+
+class DbtTimingRegressionConfig(Config):
+    max_regression_pct: float = 50.0
+    trailing_runs: int = 10
+
+
+# fails the run so `email_on_run_failure` reports models that got slower
+@asset(
+    compute_kind="python",
+    key=["dbt_timing_regressions"],
+    deps=["github_metrics_backend_to_frontend", "bigquery_backend_to_frontend"],
+    group_name="dbt_performance",
+)
+def dagster_check_dbt_timing_regressions(
+    context: AssetExecutionContext, config: DbtTimingRegressionConfig
+) -> None:
+    regressions = get_dbt_timing_regressions(
+        context.run_id, config.max_regression_pct, config.trailing_runs
+    )
+    if regressions:
+        regression_lines = [
+            f"{i.model_name}: {i.execution_time:.2f}s vs {i.trailing_median:.2f}s "
+            f"trailing median (+{i.regression_pct:.0f}%)"
+            for i in regressions
+        ]
+        raise AssertionError(
+            f"{len(regressions)} dbt models regressed by more than "
+            f"{config.max_regression_pct:.0f}%<br>" + "<br>".join(regression_lines)
+        )
+
+    context.add_output_metadata({"n_regressions": 0})
 
 
 # GITHUB
@@ -320,6 +542,31 @@ def dagster_get_following(context: AssetExecutionContext) -> None:
     context.add_output_metadata({"n_records": n})
 
 
+class MirrorConfig(Config):
+    max_workers: int = 4
+    threads: int = 8
+    memory_limit: str = "4GB"
+
+
+def get_mirror_metadata(
+    mirrored_tables: list[MirroredTable], elapsed_time: float
+) -> dict[str, Any]:
+    return {
+        "elapsed_time": elapsed_time,
+        "n_tables_written": sum(i.strategy != "carried" for i in mirrored_tables),
+        "mirrored_tables": {
+            i.table: {
+                "strategy": i.strategy,
+                "n_records": i.n_records,
+                "n_written": i.n_written,
+                "elapsed_time": round(i.elapsed_time, 2),
+                "rows_per_second": round(i.rows_per_second),
+            }
+            for i in mirrored_tables
+        },
+    }
+
+
 @asset(
     compute_kind="python",
     key=["github_metrics_backend_to_frontend"],
@@ -335,10 +582,19 @@ def dagster_get_following(context: AssetExecutionContext) -> None:
     ],
     group_name="github_metrics_daily_4",
 )
-def github_metrics_table_copy(context: AssetExecutionContext) -> None:
+def github_metrics_table_copy(
+    context: AssetExecutionContext, config: MirrorConfig
+) -> None:
     start_time = time.time()
-    copy_backend_to_frontend()
-    context.add_output_metadata({"elapsed_time": time.time() - start_time})
+    mirrored_tables = copy_backend_to_frontend(
+        GITHUB_TABLES + STATUS_TABLES,
+        max_workers=config.max_workers,
+        threads=config.threads,
+        memory_limit=config.memory_limit,
+    )
+    context.add_output_metadata(
+        get_mirror_metadata(mirrored_tables, time.time() - start_time)
+    )
 
 
 @asset(
@@ -366,10 +622,17 @@ def dagster_get_pypi_downloads(context: AssetExecutionContext) -> None:
     deps=["mart_downloads_summary"],
     group_name="bigquery_daily",
 )
-def bigquery_table_copy(context: AssetExecutionContext) -> None:
+def bigquery_table_copy(context: AssetExecutionContext, config: MirrorConfig) -> None:
     start_time = time.time()
-    copy_backend_to_frontend()
-    context.add_output_metadata({"elapsed_time": time.time() - start_time})
+    mirrored_tables = copy_backend_to_frontend(
+        DOWNLOADS_TABLES + STATUS_TABLES,
+        max_workers=config.max_workers,
+        threads=config.threads,
+        memory_limit=config.memory_limit,
+    )
+    context.add_output_metadata(
+        get_mirror_metadata(mirrored_tables, time.time() - start_time)
+    )
 
 
 @asset(
@@ -4,6 +4,7 @@ from dagster_dbt import DbtCliResource
 from .assets import (
     ampere_dbt_assets,
     bigquery_table_copy,
+    dagster_check_dbt_timing_regressions,
     dagster_get_commits,
     dagster_get_followers,
     dagster_get_following,
@@ -49,6 +50,7 @@ defs = Definitions(
         dagster_refresh_downloads_plots,
         github_metrics_table_copy,
         bigquery_table_copy,
+        dagster_check_dbt_timing_regressions,
         dagster_test_run_fail,
         dagster_test_run_fail2,
         dagster_test_run_pass,
@@ -0,0 +1,181 @@
+import datetime
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import duckdb
+import pandas as pd
+from deltalake import DeltaTable
+
+from ampere.common import (
+    DeltaTableWriteMode,
+    DeltaWriteConfig,
+    get_model_primary_key,
+    write_delta_table,
+)
+from ampere.models import DbtModelTiming
+
+
+@dataclass(slots=True, frozen=True)
+class DbtModelTimingRegression:
+    model_name: str
+    execution_time: float
+    trailing_median: float
+    regression_pct: float
+
+
+def parse_dbt_timestamp(timestamp: Optional[str]) -> Optional[datetime.datetime]:
+    if timestamp is None:
+        return None
+    return datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+def parse_dbt_run_results(
+    run_results: dict[str, Any], run_id: str
+) -> list[DbtModelTiming]:
+    """
+    per-model timings from a dbt `run_results.json`. rows affected and bytes scanned
+    are only filled when the adapter reports them
+    """
+    invocation_id = run_results["metadata"]["invocation_id"]
+    generated_at = parse_dbt_timestamp(run_results["metadata"]["generated_at"])
+
+    timings = []
+    for result in run_results["results"]:
+        if not result["unique_id"].startswith("model."):
+            continue
+
+        execute_timing = next(
+            (i for i in result["timing"] if i["name"] == "execute"), None
+        )
+        started_at = None
+        completed_at = generated_at
+        if execute_timing is not None:
+            started_at = parse_dbt_timestamp(execute_timing.get("started_at"))
+            completed_at = parse_dbt_timestamp(execute_timing.get("completed_at"))
+
+        adapter_response = result.get("adapter_response") or {}
+        timings.append(
+            DbtModelTiming(
+                invocation_id=invocation_id,
+                unique_id=result["unique_id"],
+                run_id=run_id,
+                model_name=result["unique_id"].split(".")[-1],
+                status=result["status"],
+                execution_time=result["execution_time"],
+                completed_at=completed_at or generated_at,
+                started_at=started_at,
+                rows_affected=adapter_response.get("rows_affected"),
+                bytes_scanned=adapter_response.get(
+                    "bytes_processed", adapter_response.get("bytes_scanned")
+                ),
+            )
+        )
+
+    return timings
+
+
+def write_dbt_model_timings(timings: list[DbtModelTiming]) -> None:
+    if not timings:
+        print("no dbt model timings to write")
+        return
+
+    # adapters like duckdb never report rows or bytes, so those columns are typed
+    # explicitly rather than inferred from all-null values
+    df = pd.DataFrame([i.model_dump() for i in timings]).astype(
+        {"rows_affected": "Int64", "bytes_scanned": "Int64"}
+    )
+    df["started_at"] = pd.to_datetime(df["started_at"], utc=True)
+
+    write_delta_table(
+        df,
+        DeltaWriteConfig(
+            table_dir="bronze",
+            table_name=DbtModelTiming.__tablename__,  # pyright: ignore [reportArgumentType]
+            pks=get_model_primary_key(DbtModelTiming),
+            mode=DeltaTableWriteMode.APPEND,
+        ),
+    )
+
+
+def get_dbt_timing_regressions(
+    run_id: str,
+    max_regression_pct: float,
+    trailing_runs: int = 10,
+    min_trailing_runs: int = 3,
+    min_execution_time: float = 1.0,
+) -> list[DbtModelTimingRegression]:
+    """
+    models built in `run_id` that took more than `max_regression_pct` percent longer
+    than the median of their previous `trailing_runs` successful builds. models
+    without `min_trailing_runs` builds of history or that finish in under
+    `min_execution_time` seconds are ignored to avoid alerting on noise
+    """
+    table_path = (
+        Path(__file__).parents[1] / "data" / "bronze" / str(DbtModelTiming.__tablename__)
+    )
+    if not (table_path / "_delta_log").exists():
+        return []
+
+    timings = DeltaTable(str(table_path)).to_pyarrow_table(  # noqa: F841
+        columns=[
+            "run_id",
+            "unique_id",
+            "model_name",
+            "status",
+            "execution_time",
+            "completed_at",
+        ]
+    )
+
+    regressions = duckdb.sql(
+        f"""
+        with
+        current_run as (
+            select
+                unique_id,
+                model_name,
+                max(execution_time) as execution_time
+            from timings
+            where run_id = '{run_id}' and status = 'success'
+            group by all
+        ),
+
+        history as (
+            select
+                unique_id,
+                execution_time,
+                row_number() over (
+                    partition by unique_id order by completed_at desc
+                ) as rn
+            from timings
+            where run_id <> '{run_id}' and status = 'success'
+        ),
+
+        trailing_timings as (
+            select
+                unique_id,
+                median(execution_time) as trailing_median,
+                count(*) as n_runs
+            from history
+            where rn <= {trailing_runs}
+            group by all
+        )
+
+        select
+            a.model_name,
+            a.execution_time,
+            b.trailing_median,
+            (a.execution_time / b.trailing_median - 1) * 100 as regression_pct
+        from current_run as a
+        inner join trailing_timings as b on a.unique_id = b.unique_id
+        where
+            b.n_runs >= {min_trailing_runs}
+            and a.execution_time >= {min_execution_time}
+            and b.trailing_median > 0
+            and a.execution_time > b.trailing_median * (1 + {max_regression_pct} / 100)
+        order by regression_pct desc
+        """
+    ).fetchall()
+
+    return [DbtModelTimingRegression(*i) for i in regressions]
@@ -1,20 +1,70 @@
 import datetime
+import hashlib
 import time
-from typing import Optional
-
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from deltalake import DeltaTable
 from dotenv import load_dotenv
 from google.cloud import bigquery
 
 from ampere.common import (
     DeltaTableWriteMode,
     DeltaWriteConfig,
+    format_list_sql_query,
     get_backend_db_con,
     get_current_time,
     get_model_primary_key,
+    write_delta_batches,
     write_delta_table,
 )
-from ampere.models import PyPIDownload, PyPIQueryConfig
+from ampere.models import (
+    PyPIDownloadDimension,
+    PyPIDownloadFact,
+    PyPIQueryChunk,
+    PyPIQueryChunkStatus,
+    PyPIQueryConfig,
+)
+
+# claims older than this without a `done` event are assumed to belong to a crashed run
+PYPI_CHUNK_CLAIM_TIMEOUT = datetime.timedelta(hours=2)
+
+# query results are kept on disk so a run that fails after a paid scan can replay it
+PYPI_QUERY_CACHE_DIR = Path(__file__).parents[1] / "data" / "cache" / "bigquery"
+PYPI_QUERY_CACHE_MAX_AGE = datetime.timedelta(days=7)
+PYPI_QUERY_CACHE_MAX_BYTES = 5 * 1024**3
+
+# bigquery dry runs are free, so every query is priced before it runs
+PYPI_TARGET_BYTES_PER_QUERY = 50 * 1024**3
+PYPI_DAILY_BYTES_BUDGET = 500 * 1024**3
+
+
+@dataclass
+class QueryStats:
+    bytes_processed: int = 0
+
+
+@dataclass(slots=True, frozen=True)
+class PyPIQueryGroupResult:
+    n_records: int
+    # chunks another job held a live claim on, left for a later run
+    pending: list[PyPIQueryConfig]
+
+
+@dataclass(slots=True, frozen=True)
+class PyPIQueryPlan:
+    groups: list[list[PyPIQueryConfig]]
+    # chunks that did not fit in today's byte budget, left for a later run
+    pending: list[PyPIQueryConfig]
 
 
 def record_pypi_query(query: PyPIQueryConfig) -> None:
@@ -28,16 +78,110 @@ def record_pypi_query(query: PyPIQueryConfig) -> None:
     write_delta_table([query], config)
 
 
-def get_pypi_downloads_from_bigquery(
-    config: PyPIQueryConfig, dry_run: bool = True
-) -> Optional[pd.DataFrame]:
-    max_date_where = ""
-    if config.max_date is not None:
-        max_date_where = (
-            f"and TIMESTAMP_TRUNC(timestamp, day) <= timestamp ('{config.max_date}')"
-        )
+def get_pypi_query_chunk_key(
+    query: PyPIQueryConfig | PyPIQueryChunk,
+) -> tuple[str, str, str]:
+    return query.repo, query.min_date, str(query.max_date)
+
 
-    cmd = f"""
+def read_pypi_query_chunks(version: Optional[int] = None) -> list[PyPIQueryChunk]:
+    """chunk ledger events, as of delta `version` when given"""
+    table_path = (
+        Path(__file__).parents[1] / "data" / "bronze" / PyPIQueryChunk.__tablename__
+    )
+    if not (table_path / "_delta_log").exists():
+        return []
+
+    records = DeltaTable(str(table_path), version=version).to_pyarrow_table().to_pylist()
+    return [PyPIQueryChunk.model_validate(i) for i in records]
+
+
+def record_pypi_query_chunk(
+    query: PyPIQueryConfig,
+    status: PyPIQueryChunkStatus,
+    run_id: str,
+    job_id: str,
+    n_records: int = 0,
+) -> Optional[int]:
+    repo, min_date, max_date = get_pypi_query_chunk_key(query)
+    chunk = PyPIQueryChunk(
+        repo=repo,
+        min_date=min_date,
+        max_date=max_date,
+        status=status,
+        run_id=run_id,
+        updated_at=get_current_time(),
+        n_records=n_records,
+        job_id=job_id,
+    )
+
+    config = DeltaWriteConfig(
+        table_dir="bronze",
+        table_name=PyPIQueryChunk.__tablename__,  # pyright: ignore [reportArgumentType]
+        pks=get_model_primary_key(PyPIQueryChunk),
+        mode=DeltaTableWriteMode.APPEND,
+    )
+    return write_delta_table([chunk], config, cleanup=False)
+
+
+def claim_pypi_query_chunk(
+    query: PyPIQueryConfig, run_id: str, job_id: str
+) -> Optional[PyPIQueryChunkStatus]:
+    """
+    appends a claim for `query` and returns `None` when this run owns the chunk,
+    otherwise the status of the event blocking it. races are settled by delta commit
+    order rather than clocks: a claim only loses to a `done` event or a live claim
+    from another job committed in an earlier version. claims left by an earlier run
+    of the same `job_id` are taken over, so a restarted job resumes its own chunks
+    """
+    version = record_pypi_query_chunk(query, PyPIQueryChunkStatus.claimed, run_id, job_id)
+    if version is None:
+        raise RuntimeError(f"could not find the ledger commit for claim {run_id}")
+
+    chunk_key = get_pypi_query_chunk_key(query)
+    earlier_events = []
+    if version > 0:
+        earlier_events = [
+            i
+            for i in read_pypi_query_chunks(version - 1)
+            if get_pypi_query_chunk_key(i) == chunk_key
+        ]
+    if any(i.status == PyPIQueryChunkStatus.done for i in earlier_events):
+        return PyPIQueryChunkStatus.done
+
+    failed_run_ids = {
+        i.run_id for i in earlier_events if i.status == PyPIQueryChunkStatus.failed
+    }
+    claim_cutoff = get_current_time() - PYPI_CHUNK_CLAIM_TIMEOUT
+    if any(
+        i.status == PyPIQueryChunkStatus.claimed
+        and i.updated_at >= claim_cutoff
+        and i.run_id not in failed_run_ids
+        and i.job_id != job_id
+        for i in earlier_events
+    ):
+        return PyPIQueryChunkStatus.claimed
+
+    return None
+
+
+def get_pending_pypi_queries(queries: list[PyPIQueryConfig]) -> list[PyPIQueryConfig]:
+    done_chunks = {
+        get_pypi_query_chunk_key(i)
+        for i in read_pypi_query_chunks()
+        if i.status == PyPIQueryChunkStatus.done
+    }
+
+    pending = [i for i in queries if get_pypi_query_chunk_key(i) not in done_chunks]
+    n_skipped = len(queries) - len(pending)
+    if n_skipped > 0:
+        print(f"skipping {n_skipped} chunks that are already done")
+
+    return pending
+
+
+def format_pypi_downloads_query(where_clause: str) -> str:
+    return f"""
         select
             project,
             timestamp_trunc(`timestamp`, hour)          as `timestamp`,
@@ -52,45 +196,508 @@ def get_pypi_downloads_from_bigquery(
             current_timestamp()                         as retrieved_at
         from `bigquery-public-data.pypi.file_downloads`
         where 
-            TIMESTAMP_TRUNC(timestamp, day) >= timestamp ('{config.min_date}') 
-            {max_date_where} 
-            and project = '{config.repo}'
+            {where_clause}
         group by all
         """
 
+
+def get_pypi_downloads_query(config: PyPIQueryConfig) -> str:
+    max_date_where = ""
+    if config.max_date is not None:
+        max_date_where = (
+            f"and TIMESTAMP_TRUNC(timestamp, day) <= timestamp ('{config.max_date}')"
+        )
+
+    return format_pypi_downloads_query(
+        f"""TIMESTAMP_TRUNC(timestamp, day) >= timestamp ('{config.min_date}') 
+            {max_date_where} 
+            and project = '{config.repo}'"""
+    )
+
+
+def get_batched_pypi_downloads_query(configs: list[PyPIQueryConfig]) -> str:
+    """
+    single scan over the shared date window of every project in `configs`.
+    each project is still bounded by its own `min_date` so no rows are refetched
+    """
+    max_dates = {i.max_date for i in configs}
+    if len(max_dates) != 1 or None in max_dates:
+        raise ValueError("batched queries must share the same, non-null `max_date`")
+
+    min_date = min(i.min_date for i in configs)
+    max_date = max_dates.pop()
+    projects_sql = format_list_sql_query([i.repo for i in configs])
+    project_min_dates_sql = "\n                or ".join(
+        f"(project = '{i.repo}' "
+        f"and TIMESTAMP_TRUNC(timestamp, day) >= timestamp ('{i.min_date}'))"
+        for i in configs
+    )
+
+    return format_pypi_downloads_query(
+        f"""TIMESTAMP_TRUNC(timestamp, day) >= timestamp ('{min_date}') 
+            and TIMESTAMP_TRUNC(timestamp, day) <= timestamp ('{max_date}') 
+            and project in ({projects_sql})
+            and (
+                {project_min_dates_sql}
+            )"""
+    )
+
+
+def get_query_cache_path(cmd: str) -> Path:
+    query_hash = hashlib.sha256(" ".join(cmd.split()).encode()).hexdigest()
+    return PYPI_QUERY_CACHE_DIR / f"{query_hash}.parquet"
+
+
+def evict_query_cache(
+    max_age: datetime.timedelta = PYPI_QUERY_CACHE_MAX_AGE,
+    max_bytes: int = PYPI_QUERY_CACHE_MAX_BYTES,
+) -> None:
+    """
+    drops cached results older than `max_age`, then the oldest remaining
+    results until the cache fits in `max_bytes`
+    """
+    if not PYPI_QUERY_CACHE_DIR.exists():
+        return
+
+    cutoff = time.time() - max_age.total_seconds()
+    cache_files = []
+    for cache_path in PYPI_QUERY_CACHE_DIR.glob("*.parquet"):
+        stat = cache_path.stat()
+        if stat.st_mtime < cutoff:
+            cache_path.unlink(missing_ok=True)
+            continue
+        cache_files.append((stat.st_mtime, stat.st_size, cache_path))
+
+    total_bytes = sum(i[1] for i in cache_files)
+    n_evicted = 0
+    for _, size, cache_path in sorted(cache_files):
+        if total_bytes <= max_bytes:
+            break
+        cache_path.unlink(missing_ok=True)
+        total_bytes -= size
+        n_evicted += 1
+
+    if n_evicted > 0:
+        print(f"evicted {n_evicted} cached query results to stay under {max_bytes} bytes")
+
+
+def read_cached_query(cache_path: Path) -> Iterator[pa.RecordBatch]:
+    print(f"replaying cached query result from {cache_path}")
+    yield from pq.ParquetFile(cache_path).iter_batches()
+
+
+def cache_query_batches(
+    batches: Iterator[pa.RecordBatch], cache_path: Path
+) -> Iterator[pa.RecordBatch]:
+    """
+    passes `batches` through while writing them to `cache_path`. the file is only
+    moved into place once the whole result has been read, so a partial stream is
+    never replayed
+    """
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, batch.schema)
+            writer.write_batch(batch)
+            yield batch
+
+        if writer is None:
+            pq.write_table(pa.table({}), tmp_path)
+        else:
+            writer.close()
+            writer = None
+        tmp_path.replace(cache_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+
+
+def stream_pypi_downloads_from_bigquery(
+    cmd: str,
+    client: bigquery.Client,
+    use_cache: bool = True,
+    query_stats: Optional[QueryStats] = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    yields the query result page by page as arrow record batches instead of
+    materializing it in pandas. `client` only needs `query_and_wait` returning an
+    object with `to_arrow_iterable`, so a local fake can stand in for bigquery -
+    `total_bytes_processed` is read when the result has it. results are cached by
+    a hash of `cmd` and replayed instead of re-querying
+    """
     print(cmd)
-    if dry_run:
-        return None
 
-    client = bigquery.Client()
-    query_job = client.query_and_wait(cmd)
+    cache_path = get_query_cache_path(cmd)
+    if use_cache and cache_path.exists():
+        yield from read_cached_query(cache_path)
+        return
+
     start_time = time.time()
-    results = query_job.to_dataframe()
+    rows = client.query_and_wait(cmd)
+    if query_stats is not None:
+        query_stats.bytes_processed += getattr(rows, "total_bytes_processed", None) or 0
+
+    batches = rows.to_arrow_iterable()
+    if use_cache:
+        batches = cache_query_batches(batches, cache_path)
+
+    n_batches = 0
+    for batch in batches:
+        n_batches += 1
+        yield batch
 
     elapsed_time = time.time() - start_time
-    print(f"query finished in {elapsed_time:.2f} seconds")
+    print(f"query streamed {n_batches} batches in {elapsed_time:.2f} seconds")
+
+
+def count_records_by_project(
+    batches: Iterator[pa.RecordBatch], counts: Counter[str]
+) -> Iterator[pa.RecordBatch]:
+    for batch in batches:
+        project_counts = pc.value_counts(batch.column("project"))
+        for project, n in zip(
+            project_counts.field("values").to_pylist(),
+            project_counts.field("counts").to_pylist(),
+        ):
+            counts[project] += n
+        yield batch
+
+
+PYPI_DOWNLOAD_DIMENSION_COLS = [
+    "country_code",
+    "package_version",
+    "python_version",
+    "system_distro_name",
+    "system_distro_version",
+    "system_name",
+    "system_release",
+]
+
+
+def get_pypi_download_dimension_id(values: tuple[str, ...]) -> int:
+    """
+    blake2b of the unit-separated dimension values truncated to a signed int64.
+    it only depends on the strings, so ids stay stable across pandas versions and
+    column dtypes
+    """
+    encoded = "\x1f".join(values).encode()
+    digest = hashlib.blake2b(encoded, digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def get_pypi_download_dimension_ids(df: pd.DataFrame) -> np.ndarray:
+    """
+    content-addressed ids, so concurrent writers agree on the id of a new
+    combination without coordinating through the dimension table. each distinct
+    combination in `df` is only hashed once
+    """
+    codes, combinations = pd.MultiIndex.from_frame(
+        df[PYPI_DOWNLOAD_DIMENSION_COLS].astype(str)
+    ).factorize()
+    ids = np.array(
+        [get_pypi_download_dimension_id(i) for i in combinations], dtype=np.int64
+    )
+    return ids[codes]
 
-    return results
+
+def read_pypi_download_dimension_ids() -> set[int]:
+    table_path = (
+        Path(__file__).parents[1]
+        / "data"
+        / "bronze"
+        / PyPIDownloadDimension.__tablename__
+    )
+    if not (table_path / "_delta_log").exists():
+        return set()
+
+    records = DeltaTable(str(table_path)).to_pyarrow_table(columns=["dimension_id"])
+    return set(records.column("dimension_id").to_pylist())
+
+
+def compact_pypi_download_batches(
+    batches: Iterator[pa.RecordBatch], dimension_ids: set[int]
+) -> Iterator[pa.RecordBatch]:
+    """
+    converts `PyPIDownload` batches to `PyPIDownloadFact` batches. combinations not
+    in `dimension_ids` are merged into the dimension table before the facts
+    referencing them are yielded, so readers never see a dangling `dimension_id`
+    """
+    dimension_config = DeltaWriteConfig(
+        table_dir="bronze",
+        table_name=PyPIDownloadDimension.__tablename__,  # pyright: ignore [reportArgumentType]
+        pks=get_model_primary_key(PyPIDownloadDimension),
+        mode=DeltaTableWriteMode.MERGE,
+    )
+    fact_cols = list(PyPIDownloadFact.model_fields)
+
+    for batch in batches:
+        df = batch.to_pandas()
+        df["dimension_id"] = get_pypi_download_dimension_ids(df)
+
+        new_dimensions = df.loc[
+            ~df["dimension_id"].isin(dimension_ids),
+            list(PyPIDownloadDimension.model_fields),
+        ].drop_duplicates("dimension_id")
+        if len(new_dimensions) > 0:
+            write_delta_table(new_dimensions, dimension_config, cleanup=False)
+            dimension_ids.update(new_dimensions["dimension_id"])
+
+        yield pa.RecordBatch.from_pandas(df[fact_cols], preserve_index=False)
 
 
 def refresh_pypi_downloads_from_bigquery(
-    query_config: PyPIQueryConfig, write_config: DeltaWriteConfig, dry_run: bool = True
+    query_config: PyPIQueryConfig,
+    write_config: DeltaWriteConfig,
+    dry_run: bool = True,
+    client: Optional[bigquery.Client] = None,
 ) -> int:
-    results = get_pypi_downloads_from_bigquery(query_config, dry_run)
-    if results is None:
+    cmd = get_pypi_downloads_query(query_config)
+    if dry_run:
+        print(cmd)
         print("dry run - exiting early")
         return 0
 
-    if len(results) == 0:
+    if client is None:
+        client = bigquery.Client()
+
+    query_stats = QueryStats()
+    n_records = write_delta_batches(
+        compact_pypi_download_batches(
+            stream_pypi_downloads_from_bigquery(cmd, client, query_stats=query_stats),
+            read_pypi_download_dimension_ids(),
+        ),
+        write_config,
+    )
+    query_config.bytes_processed = query_stats.bytes_processed
+
+    if n_records == 0:
         print(
             f"0 downloads found for time period: {query_config.min_date} - {query_config.max_date}"
         )
+
+    record_pypi_query(query_config)
+    return n_records
+
+
+def refresh_batched_pypi_downloads_from_bigquery(
+    query_configs: list[PyPIQueryConfig],
+    write_config: DeltaWriteConfig,
+    dry_run: bool = True,
+    client: Optional[bigquery.Client] = None,
+) -> dict[str, int]:
+    """
+    fetches every project in `query_configs` with one query and splits the record
+    counts back out per project so each gets its own `pypi_download_queries` entry
+    """
+    cmd = get_batched_pypi_downloads_query(query_configs)
+    if dry_run:
+        print(cmd)
+        print("dry run - exiting early")
+        return {i.repo: 0 for i in query_configs}
+
+    if client is None:
+        client = bigquery.Client()
+
+    counts: Counter[str] = Counter()
+    query_stats = QueryStats()
+    write_delta_batches(
+        compact_pypi_download_batches(
+            count_records_by_project(
+                stream_pypi_downloads_from_bigquery(cmd, client, query_stats=query_stats),
+                counts,
+            ),
+            read_pypi_download_dimension_ids(),
+        ),
+        write_config,
+    )
+
+    # the scan is shared, so its cost is split evenly across the projects in it
+    for query_config in query_configs:
+        query_config.bytes_processed = query_stats.bytes_processed // len(query_configs)
+        if counts[query_config.repo] == 0:
+            print(
+                f"0 downloads found for {query_config.repo} for time period: "
+                f"{query_config.min_date} - {query_config.max_date}"
+            )
         record_pypi_query(query_config)
+
+    return {i.repo: counts[i.repo] for i in query_configs}
+
+
+def estimate_query_bytes(cmd: str, client: bigquery.Client) -> int:
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+    query_job = client.query(cmd, job_config=job_config)
+    return query_job.total_bytes_processed or 0
+
+
+def format_gib(n_bytes: int) -> str:
+    return f"{n_bytes / 1024**3:.2f} GiB"
+
+
+def get_pypi_query_group_sql(queries: list[PyPIQueryConfig]) -> str:
+    if len(queries) == 1:
+        return get_pypi_downloads_query(queries[0])
+    return get_batched_pypi_downloads_query(queries)
+
+
+def get_bytes_processed_today() -> int:
+    table_path = (
+        Path(__file__).parents[1] / "data" / "bronze" / PyPIQueryConfig.__tablename__
+    )
+    if not (table_path / "_delta_log").exists():
         return 0
-    write_delta_table(results, write_config)
 
-    record_pypi_query(query_config)
-    return len(results)
+    records = DeltaTable(str(table_path)).to_pyarrow_table()
+    if "bytes_processed" not in records.column_names:
+        return 0
+
+    today = get_current_time().date()
+    return sum(
+        i["bytes_processed"] or 0
+        for i in records.select(["retrieved_at", "bytes_processed"]).to_pylist()
+        if i["retrieved_at"].date() == today
+    )
+
+
+def plan_pypi_query_groups(
+    query_groups: list[list[PyPIQueryConfig]],
+    client: bigquery.Client,
+    daily_budget_bytes: int = PYPI_DAILY_BYTES_BUDGET,
+) -> PyPIQueryPlan:
+    """
+    prices each group with a bigquery dry run and keeps the groups that fit in
+    what is left of today's budget. skipped chunks are returned as pending
+    """
+    remaining_bytes = daily_budget_bytes - get_bytes_processed_today()
+    planned_groups = []
+    pending_queries = []
+    for group in query_groups:
+        cmd = get_pypi_query_group_sql(group)
+        if get_query_cache_path(cmd).exists():
+            estimated_bytes = 0
+        else:
+            estimated_bytes = estimate_query_bytes(cmd, client)
+
+        repos = ", ".join(i.repo for i in group)
+        date_range = f"{min(i.min_date for i in group)} -> {group[0].max_date}"
+        if estimated_bytes > remaining_bytes:
+            print(
+                f"skipping {repos} {date_range}: estimated {format_gib(estimated_bytes)} "
+                f"exceeds remaining daily budget of {format_gib(remaining_bytes)}"
+            )
+            pending_queries.extend(group)
+            continue
+
+        print(f"{repos} {date_range}: estimated {format_gib(estimated_bytes)}")
+        remaining_bytes -= estimated_bytes
+        for query in group:
+            query.estimated_bytes = estimated_bytes // len(group)
+        planned_groups.append(group)
+
+    return PyPIQueryPlan(groups=planned_groups, pending=pending_queries)
+
+
+def get_pypi_chunk_days(
+    repo: str,
+    min_date: datetime.datetime,
+    max_date: datetime.datetime,
+    target_bytes_per_query: int,
+    client: bigquery.Client,
+) -> int:
+    """
+    sizes backfill chunks from the dry run cost of the full window, assuming
+    bytes scanned grow linearly with the number of days queried
+    """
+    n_days = max((max_date - min_date).days, 1)
+    query = PyPIQueryConfig(
+        repo=repo,
+        min_date=datetime.datetime.strftime(min_date, "%Y-%m-%d"),
+        max_date=datetime.datetime.strftime(max_date, "%Y-%m-%d"),
+        retrieved_at=get_current_time(),
+    )
+    total_bytes = estimate_query_bytes(get_pypi_downloads_query(query), client)
+    print(f"{repo} full window estimated at {format_gib(total_bytes)}")
+    if total_bytes == 0:
+        return n_days
+
+    return max(1, int(target_bytes_per_query * n_days // total_bytes))
+
+
+def group_pypi_queries(queries: list[PyPIQueryConfig]) -> list[list[PyPIQueryConfig]]:
+    """
+    groups queries for different repos that end on the same date so they can share
+    a single scan. backfill chunks of one repo never share an end date and stay solo
+    """
+    groups: dict[Optional[str], list[PyPIQueryConfig]] = defaultdict(list)
+    solo_queries = []
+    for query in queries:
+        group = groups[query.max_date]
+        if query.max_date is None or any(i.repo == query.repo for i in group):
+            solo_queries.append([query])
+            continue
+        group.append(query)
+
+    return [i for i in groups.values() if len(i) > 0] + solo_queries
+
+
+def run_pypi_query_group(
+    queries: list[PyPIQueryConfig],
+    write_config: DeltaWriteConfig,
+    run_id: str,
+    job_id: str,
+    client: bigquery.Client,
+) -> PyPIQueryGroupResult:
+    claimed_queries = []
+    pending_queries = []
+    for query in queries:
+        conflict = claim_pypi_query_chunk(query, run_id, job_id)
+        if conflict == PyPIQueryChunkStatus.done:
+            print(f"{query.repo} {query.min_date} -> {query.max_date} is done. skipping")
+            continue
+        if conflict == PyPIQueryChunkStatus.claimed:
+            print(
+                f"{query.repo} {query.min_date} -> {query.max_date} "
+                "is claimed by another job. leaving it pending"
+            )
+            pending_queries.append(query)
+            continue
+        claimed_queries.append(query)
+
+    if len(claimed_queries) == 0:
+        return PyPIQueryGroupResult(n_records=0, pending=pending_queries)
+
+    try:
+        if len(claimed_queries) == 1:
+            query = claimed_queries[0]
+            n_records = refresh_pypi_downloads_from_bigquery(
+                query, write_config, dry_run=False, client=client
+            )
+            records_by_repo = {query.repo: n_records}
+        else:
+            records_by_repo = refresh_batched_pypi_downloads_from_bigquery(
+                claimed_queries, write_config, dry_run=False, client=client
+            )
+    except Exception:
+        for query in claimed_queries:
+            record_pypi_query_chunk(query, PyPIQueryChunkStatus.failed, run_id, job_id)
+        raise
+
+    for query in claimed_queries:
+        n_records = records_by_repo[query.repo]
+        record_pypi_query_chunk(
+            query, PyPIQueryChunkStatus.done, run_id, job_id, n_records
+        )
+        print(
+            f"{query.repo} {query.min_date} -> {query.max_date} done - {n_records} records"
+        )
+
+    return PyPIQueryGroupResult(
+        n_records=sum(records_by_repo.values()), pending=pending_queries
+    )
 
 
 def get_pypi_download_query_dates() -> list[PyPIQueryConfig]:
@@ -173,9 +780,21 @@ def get_backfill_queries(
     min_date: datetime.datetime,
     max_date: Optional[datetime.datetime] = None,
     max_days_per_chunk: int = 15,
+    target_bytes_per_query: Optional[int] = None,
+    client: Optional[bigquery.Client] = None,
 ) -> list[PyPIQueryConfig]:
     max_date_final = max_date
 
+    if target_bytes_per_query is not None:
+        max_days_per_chunk = get_pypi_chunk_days(
+            repo,
+            min_date,
+            get_current_time() if max_date is None else max_date,
+            target_bytes_per_query,
+            bigquery.Client() if client is None else client,
+        )
+        print(f"using {max_days_per_chunk} days per chunk")
+
     if max_date_final is None:
         n_days_to_fill = (get_current_time() - min_date).days
     else:
@@ -232,25 +851,64 @@ def add_backfill_to_table(
     max_date: Optional[datetime.datetime],
     max_days_per_chunk: int,
     dry_run: bool,
+    max_workers: int = 4,
+    target_bytes_per_query: Optional[int] = None,
+    daily_budget_bytes: int = PYPI_DAILY_BYTES_BUDGET,
+    estimate_bytes: bool = False,
+    client: Optional[bigquery.Client] = None,
 ):
-    queries = get_backfill_queries(repo, min_date, max_date, max_days_per_chunk)
+    """
+    dry runs only size chunks from `target_bytes_per_query` when `estimate_bytes`
+    allows them to reach bigquery, and fall back to `max_days_per_chunk` otherwise
+    """
+    if dry_run and not estimate_bytes and target_bytes_per_query is not None:
+        print(
+            f"dry run without byte estimates - using {max_days_per_chunk} days per chunk"
+        )
+        target_bytes_per_query = None
+
+    queries = get_backfill_queries(
+        repo, min_date, max_date, max_days_per_chunk, target_bytes_per_query, client
+    )
 
     print(f"backfilling {repo} {'-' * 20}")
     for query in queries:
         print(query.min_date, "->", query.max_date)
 
-    refresh_all_pypi_downloads(queries, dry_run)
+    refresh_all_pypi_downloads(
+        queries,
+        dry_run,
+        max_workers,
+        daily_budget_bytes=daily_budget_bytes,
+        job_id=f"backfill_{repo}",
+        estimate_bytes=estimate_bytes,
+        client=client,
+    )
 
 
 def refresh_all_pypi_downloads(
-    queries: Optional[list[PyPIQueryConfig]] = None, dry_run: bool = True
+    queries: Optional[list[PyPIQueryConfig]] = None,
+    dry_run: bool = True,
+    max_workers: int = 4,
+    batch_projects: bool = True,
+    daily_budget_bytes: int = PYPI_DAILY_BYTES_BUDGET,
+    job_id: str = "pypi_downloads",
+    estimate_bytes: bool = False,
+    client: Optional[bigquery.Client] = None,
 ) -> int:
+    """
+    `job_id` identifies the job across restarts - a rerun with the same id takes
+    over chunks its crashed run claimed, while chunks claimed by other jobs are
+    left pending and fail the run so it is retried. dry runs work offline and only
+    print the planned groups unless `estimate_bytes` prices them against bigquery.
+    `client` defaults to a `bigquery.Client` created once it is needed
+    """
     load_dotenv()
 
     write_config = DeltaWriteConfig(
         table_dir="bronze",
-        table_name=PyPIDownload.__tablename__,  # pyright: ignore [reportArgumentType]
-        pks=get_model_primary_key(PyPIDownload),
+        table_name=PyPIDownloadFact.__tablename__,  # pyright: ignore [reportArgumentType]
+        pks=get_model_primary_key(PyPIDownloadFact),
         mode=DeltaTableWriteMode.APPEND,  # less resource intensive than merge
     )
 
@@ -261,11 +919,65 @@ def refresh_all_pypi_downloads(
         print("nothing to write! exiting early")
         return 0
 
+    query_groups = (
+        group_pypi_queries(queries) if batch_projects else [[i] for i in queries]
+    )
+    if dry_run:
+        if estimate_bytes:
+            if client is None:
+                client = bigquery.Client()
+            query_groups = plan_pypi_query_groups(
+                query_groups, client, daily_budget_bytes
+            ).groups
+        for group in query_groups:
+            if len(group) == 1:
+                refresh_pypi_downloads_from_bigquery(group[0], write_config, dry_run)
+            else:
+                refresh_batched_pypi_downloads_from_bigquery(group, write_config, dry_run)
+        return 0
+
+    evict_query_cache()
+    queries = get_pending_pypi_queries(queries)
+    query_groups = (
+        group_pypi_queries(queries) if batch_projects else [[i] for i in queries]
+    )
+    run_id = str(uuid.uuid4())
+    if client is None:
+        client = bigquery.Client()
+    plan = plan_pypi_query_groups(query_groups, client, daily_budget_bytes)
+    query_groups = plan.groups
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                run_pypi_query_group, group, write_config, run_id, job_id, client
+            )
+            for group in query_groups
+        ]
+
     records_added = 0
-    for query in queries:
-        records_added += refresh_pypi_downloads_from_bigquery(
-            query, write_config, dry_run
+    failed_chunks = []
+    pending_chunks = list(plan.pending)
+    for group, future in zip(query_groups, futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            for query in group:
+                print(f"{query.repo} {query.min_date} -> {query.max_date} failed: {e}")
+            failed_chunks.extend(group)
+            continue
+
+        records_added += result.n_records
+        pending_chunks.extend(result.pending)
+
+    if len(failed_chunks) > 0 or len(pending_chunks) > 0:
+        raise RuntimeError(
+            f"{len(failed_chunks)}/{len(queries)} chunks failed and "
+            f"{len(pending_chunks)}/{len(queries)} are still pending - "
+            f"{len(plan.pending)} over today's byte budget and the rest claimed by "
+            "another job. rerun to resume from the chunk ledger"
         )
+
     return records_added
 
 
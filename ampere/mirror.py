@@ -1,98 +1,453 @@
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Optional
 
 import duckdb
+from duckdb import DuckDBPyConnection
 
-from ampere.common import get_backend_db_con, get_frontend_db_con, timeit
-
-
-def create_new_frontend_db():
-    base_dir = Path(__file__).parents[1] / "data"
-    db_path = base_dir / "frontend.duckdb"
-
-    print("deleting existing file...")
-    db_path.unlink(missing_ok=True)
-
-    print("creating new file...")
-    get_frontend_db_con(read_only=False)
-
-
-def write_backend_tables_to_frontend() -> None:
-    tables = [
-        "int_downloads_melted",
-        "int_downloads_melted_daily",
-        "int_downloads_melted_weekly",
-        "int_downloads_melted_monthly",
-        "int_network_stargazers",
-        "int_internal_followers",
-        "int_network_follower_details",
-        "int_status_details",
-        "stg_repos",
-        "mart_downloads_summary",
-        "mart_feed_events",
-        "mart_issues",
-        "mart_issues_summary",
-        "mart_stargazers_pivoted",
-        "mart_repo_summary",
-        "mart_status_details",
-    ]
+from ampere.common import get_frontend_parquet_dir, timeit
+
+DOWNLOADS_TABLES = [
+    "int_downloads_melted",
+    "int_downloads_melted_daily",
+    "int_downloads_melted_weekly",
+    "int_downloads_melted_monthly",
+    "mart_downloads_summary",
+]
+
+GITHUB_TABLES = [
+    "int_network_stargazers",
+    "int_internal_followers",
+    "int_network_follower_details",
+    "stg_repos",
+    "mart_feed_events",
+    "mart_issues",
+    "mart_issues_summary",
+    "mart_stargazers_pivoted",
+    "mart_repo_summary",
+]
+
+STATUS_TABLES = [
+    "int_status_details",
+    "mart_status_details",
+    "mart_dbt_model_timings",
+]
+
+MIRRORED_TABLES = DOWNLOADS_TABLES + GITHUB_TABLES + STATUS_TABLES
+
+MIRRORED_VIEWS = [
+    "int_status_summary",
+    "int_status_summary_pivoted",
+    "mart_status_summary",
+    "mart_status_dbt_timings",
+]
+
+# incremental models only rewrite rows at or after their latest timestamp, so their
+# frontend copies can be topped up from that watermark instead of recopied
+APPEND_ONLY_TABLES = {
+    "int_downloads_melted": "download_timestamp",
+    "int_downloads_melted_daily": "download_timestamp",
+    "mart_feed_events": "event_timestamp",
+}
+
+# marts read by the app and api, clustered in the frontend db and its parquet export
+# on the columns their readers filter by so zone maps and row group statistics can
+# skip most of each table
+SERVED_TABLES = {
+    "int_downloads_melted": ["repo", "group_name", "download_timestamp"],
+    "int_downloads_melted_daily": ["repo", "group_name", "download_timestamp"],
+    "int_downloads_melted_weekly": ["repo", "group_name", "download_timestamp"],
+    "int_downloads_melted_monthly": ["repo", "group_name", "download_timestamp"],
+    "mart_downloads_summary": ["repo", "group_name", "download_date"],
+    "mart_feed_events": ["repo_name", "event_timestamp"],
+    "mart_repo_summary": ["repo_name", "metric_type", "metric_date"],
+    "mart_issues": ["repo"],
+    "mart_issues_summary": [],
+    "mart_stargazers_pivoted": [],
+    "int_network_stargazers": [],
+    "int_internal_followers": [],
+    "int_network_follower_details": [],
+    "stg_repos": ["repo_name"],
+}
+
+PARQUET_ROW_GROUP_SIZE = 122_880
+
+
+@dataclass(slots=True, frozen=True)
+class MirroredTable:
+    table: str
+    strategy: str
+    n_records: int
+    n_written: int
+    elapsed_time: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.n_written / self.elapsed_time if self.elapsed_time > 0 else 0.0
+
+
+def get_frontend_db_path() -> Path:
+    return Path(__file__).parents[1] / "data" / "frontend.duckdb"
+
+
+def get_frontend_build_path() -> Path:
+    """a fresh generation file next to the live frontend db, on the same filesystem"""
+    db_path = get_frontend_db_path()
+    return db_path.with_name(f"{db_path.stem}.{uuid.uuid4().hex[:12]}.duckdb")
+
+
+def get_frontend_build_con(
+    build_path: Path, threads: Optional[int] = None, memory_limit: Optional[str] = None
+) -> DuckDBPyConnection:
+    """
+    attaches the build file as the `frontend` catalog so view definitions referring to
+    `frontend` bind the same way they will once the file is published. `threads` and
+    `memory_limit` cap the whole mirror, which spills to a scratch directory beside
+    the build once over the limit
+    """
+    con = duckdb.connect(config={"TimeZone": "UTC"})
+    if threads is not None:
+        con.sql(f"set threads = {threads}")
+    if memory_limit is not None:
+        con.sql(f"set memory_limit = '{memory_limit}'")
+    con.sql(f"set temp_directory = '{build_path}.tmp'")
+    con.sql(f"attach '{build_path}' as frontend")
+    con.sql("use frontend")
+    return con
+
+
+def close_frontend_build_con(con: DuckDBPyConnection) -> None:
+    """checkpoints and detaches the build file so no wal is left behind"""
+    con.sql("checkpoint frontend")
+    con.sql("use memory")
+    con.sql("detach frontend")
+    con.close()
+
+
+def publish_frontend_db(build_path: Path) -> None:
+    """
+    atomically swaps the build file in as `frontend.duckdb`. new readers open the new
+    generation while readers that already hold the old file keep reading it until
+    they close their connection
+    """
+    db_path = get_frontend_db_path()
+    os.replace(build_path, db_path)
+    print(f"published {build_path.name} as {db_path.name}")
+
+
+def export_served_tables(
+    frontend_con: DuckDBPyConnection,
+    generation_dir: Path,
+    written_tables: set[str],
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+) -> None:
+    """
+    writes each served mart to `generation_dir` as sorted parquet with zstd row
+    groups of `row_group_size`. marts that were not rewritten in this build are hard
+    linked from the published generation instead of exported again
+    """
+    current_dir = get_frontend_parquet_dir() / "current"
+    generation_dir.mkdir(parents=True)
+    for table in SERVED_TABLES:
+        parquet_path = generation_dir / f"{table}.parquet"
+        published_path = current_dir / f"{table}.parquet"
+        if table not in written_tables and published_path.exists():
+            os.link(published_path.resolve(), parquet_path)
+            continue
+
+        start_time = time.time()
+        frontend_con.sql(f"""
+            copy (select * from {table} {get_cluster_order_by(table)})
+            to '{parquet_path}'
+            (format parquet, compression zstd, row_group_size {row_group_size})
+        """)
+        print(f"exported {parquet_path.name} in {time.time() - start_time:.2f}s")
+
+
+def publish_frontend_parquet(generation_dir: Path, n_generations: int = 2) -> None:
+    """
+    atomically repoints the `current` symlink at `generation_dir`, then removes all
+    but the newest `n_generations` so connections opened on the previous one drain
+    """
+    parquet_dir = generation_dir.parent
+    staged_link = parquet_dir / f"current.{generation_dir.name}"
+    os.symlink(generation_dir.name, staged_link)
+    os.replace(staged_link, parquet_dir / "current")
+    print(f"published parquet generation {generation_dir.name}")
+
+    generations = sorted(
+        (i for i in parquet_dir.iterdir() if i.is_dir() and not i.is_symlink()),
+        key=lambda x: x.stat().st_mtime,
+        reverse=True,
+    )
+    for stale_dir in generations[n_generations:]:
+        shutil.rmtree(stale_dir, ignore_errors=True)
+
+
+def remove_frontend_build(build_path: Path) -> None:
+    build_path.unlink(missing_ok=True)
+    build_path.with_name(f"{build_path.name}.wal").unlink(missing_ok=True)
+    shutil.rmtree(f"{build_path}.tmp", ignore_errors=True)
 
-    backend_con = get_backend_db_con()
-    frontend_con = get_frontend_db_con(read_only=False)
-    for table in tables:
-        offset = 0
-        batch_size = 200_000
-        first_batch = True
-        while True:
-            print(f"writing {table} records {offset:,} to {(offset + batch_size):,}...")
-
-            df = backend_con.sql(
-                f"SELECT * FROM {table} LIMIT {batch_size} OFFSET {offset}"
-            ).to_df()
-
-            if df.empty:
-                break
-
-            if first_batch:
-                duckdb.sql(
-                    f"CREATE TABLE {table} AS SELECT * FROM df", connection=frontend_con
-                )
-                first_batch = False
-            else:
-                duckdb.sql(
-                    f"INSERT INTO {table} SELECT * FROM df", connection=frontend_con
-                )
-            offset += batch_size
-
-
-def write_backend_views_to_frontend() -> None:
-    backend_con = get_backend_db_con()
-    frontend_con = get_frontend_db_con(read_only=False)
-
-    views_to_copy = [
-        "int_status_summary",
-        "int_status_summary_pivoted",
-        "mart_status_summary",
+
+def attach_backend_db(con: DuckDBPyConnection) -> None:
+    """attaches the backend database read-only as the `backend` catalog"""
+    db_path = Path(__file__).parents[1] / "data" / "backend.duckdb"
+    con.sql(f"attach if not exists '{db_path}' as backend (read_only)")
+
+
+def get_cluster_order_by(table: str) -> str:
+    sort_cols = SERVED_TABLES.get(table)
+    return f"order by {', '.join(sort_cols)}" if sort_cols else ""
+
+
+def copy_attached_table(con: DuckDBPyConnection, table: str) -> int:
+    """
+    copies a table from the attached backend inside duckdb in a single `create table
+    as`, without materializing it in python. served marts are written clustered on
+    their sort columns
+    """
+    con.sql(f"""
+        create or replace table {table} as
+        select * from backend.main.{table}
+        {get_cluster_order_by(table)}
+    """)
+    return con.sql(f"select count(*) from {table}").fetchall()[0][0]
+
+
+def get_table_checksum(
+    con: DuckDBPyConnection,
+    table_ref: str,
+    where: str = "true",
+    params: Optional[list[Any]] = None,
+) -> tuple[int, int]:
+    """row count and an order-independent sum of row hashes"""
+    return con.execute(
+        f"select count(*), coalesce(sum(hash(t)), 0) from {table_ref} as t where {where}",
+        params,
+    ).fetchall()[0]
+
+
+def get_table_schema(con: DuckDBPyConnection, catalog: str, table: str) -> list[tuple]:
+    return con.sql(f"""
+        select column_name, data_type
+        from information_schema.columns
+        where table_catalog = '{catalog}'
+        and table_schema = 'main'
+        and table_name = '{table}'
+        order by ordinal_position
+    """).fetchall()
+
+
+def get_mirrored_checksums(con: DuckDBPyConnection) -> dict[str, tuple[int, int]]:
+    """checksums of the backend tables as of the mirror that produced this generation"""
+    con.sql("""
+        create table if not exists mirror_table_state (
+            table_name varchar primary key,
+            n_records bigint,
+            checksum hugeint,
+            mirrored_at timestamptz
+        )
+    """)
+    records = con.sql(
+        "select table_name, n_records, checksum from mirror_table_state"
+    ).fetchall()
+    return {table: (n_records, checksum) for table, n_records, checksum in records}
+
+
+def append_attached_table(
+    con: DuckDBPyConnection, table: str, watermark_col: str
+) -> Optional[int]:
+    """
+    replaces the rows at or past the frontend copy's latest `watermark_col` with the
+    backend's, provided every row before it still matches. returns the number of
+    rows written, or None when the copy has diverged and needs a full recopy
+    """
+    if get_table_schema(con, "frontend", table) != get_table_schema(
+        con, "backend", table
+    ):
+        return None
+
+    watermark = con.sql(f"select max({watermark_col}) from {table}").fetchall()[0][0]
+    if watermark is None:
+        return None
+
+    before_watermark = f"{watermark_col} < $1"
+    backend_checksum = get_table_checksum(
+        con, f"backend.main.{table}", before_watermark, [watermark]
+    )
+    frontend_checksum = get_table_checksum(con, table, before_watermark, [watermark])
+    if backend_checksum != frontend_checksum:
+        return None
+
+    con.execute(f"delete from {table} where {watermark_col} >= $1", [watermark])
+    return con.execute(
+        f"""
+        insert into {table}
+        select * from backend.main.{table}
+        where {watermark_col} >= $1
+        {get_cluster_order_by(table)}
+        """,
+        [watermark],
+    ).fetchall()[0][0]
+
+
+def mirror_table(
+    cursor: DuckDBPyConnection,
+    table: str,
+    exists: bool,
+    mirrored_checksum: Optional[tuple[int, int]],
+) -> tuple[MirroredTable, tuple[int, int]]:
+    """
+    brings one table up to date on its own cursor. a table whose backend checksum
+    matches the one recorded for the carried generation is left alone, append-only
+    tables are topped up, and everything else is recopied
+    """
+    start_time = time.time()
+    cursor.sql("use frontend")
+    checksum = get_table_checksum(cursor, f"backend.main.{table}")
+
+    n_written = None
+    if exists and mirrored_checksum == checksum:
+        strategy, n_written = "carried", 0
+    elif exists and table in APPEND_ONLY_TABLES:
+        strategy = "appended"
+        n_written = append_attached_table(cursor, table, APPEND_ONLY_TABLES[table])
+
+    if n_written is None:
+        strategy = "copied"
+        n_written = copy_attached_table(cursor, table)
+
+    cursor.close()
+    mirrored_table = MirroredTable(
+        table=table,
+        strategy=strategy,
+        n_records=checksum[0],
+        n_written=n_written,
+        elapsed_time=time.time() - start_time,
+    )
+    print(
+        f"{strategy} {table} - wrote {n_written:,}/{checksum[0]:,} records "
+        f"in {mirrored_table.elapsed_time:.2f}s "
+        f"({mirrored_table.rows_per_second:,.0f} rows/s)"
+    )
+    return mirrored_table, checksum
+
+
+def write_backend_tables_to_frontend(
+    frontend_con: DuckDBPyConnection, tables: list[str], max_workers: int = 4
+) -> list[MirroredTable]:
+    """
+    mirrors `tables` into the build, `max_workers` at a time. the tables are
+    independent so each gets its own cursor, and the checksums are recorded once all
+    of them finish. mirrored tables missing from the build are copied even when not
+    requested
+    """
+    attach_backend_db(frontend_con)
+    mirrored_checksums = get_mirrored_checksums(frontend_con)
+    existing_tables = {
+        i[0]
+        for i in frontend_con.sql(
+            "select table_name from duckdb_tables() where database_name = 'frontend'"
+        ).fetchall()
+    }
+    tables_to_mirror = [
+        i for i in MIRRORED_TABLES if i in tables or i not in existing_tables
     ]
 
-    views_to_copy_sql = "'" + "', '".join(views_to_copy) + "'"
-    views = backend_con.sql(f"""
-        select table_name, view_definition
-        from information_schema.views
-        where table_schema = 'main'
-        and table_name in ({views_to_copy_sql})
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                mirror_table,
+                frontend_con.cursor(),
+                table,
+                table in existing_tables,
+                mirrored_checksums.get(table),
+            )
+            for table in tables_to_mirror
+        ]
+        results = [future.result() for future in futures]
+
+    frontend_con.executemany(
+        "insert or replace into mirror_table_state values ($1, $2, $3, now())",
+        [[mirrored_table.table, *checksum] for mirrored_table, checksum in results],
+    )
+    frontend_con.sql("detach backend")
+    return [mirrored_table for mirrored_table, _ in results]
+
+
+def write_backend_views_to_frontend(frontend_con: DuckDBPyConnection) -> None:
+    views_to_copy_sql = "'" + "', '".join(MIRRORED_VIEWS) + "'"
+    attach_backend_db(frontend_con)
+    views = frontend_con.sql(f"""
+        select view_name, sql
+        from duckdb_views()
+        where database_name = 'backend'
+        and schema_name = 'main'
+        and view_name in ({views_to_copy_sql})
     """).fetchall()
+    frontend_con.sql("detach backend")
 
     for view_name, view_definition in views:
         view_definition_clean = view_definition.replace("backend", "frontend")
         print(f"creating view {view_name}...")
+        frontend_con.sql(f"drop view if exists {view_name}")
         frontend_con.sql(f"{view_definition_clean}")
 
 
 @timeit
-def copy_backend_to_frontend() -> None:
-    create_new_frontend_db()
-    write_backend_tables_to_frontend()
-    write_backend_views_to_frontend()
+def copy_backend_to_frontend(
+    tables: Optional[list[str]] = None,
+    max_workers: int = 4,
+    threads: Optional[int] = None,
+    memory_limit: Optional[str] = None,
+) -> list[MirroredTable]:
+    """
+    builds a new frontend generation beside the live one and swaps it in, so readers
+    never see a missing or partially written database. the build starts as a copy of
+    the live generation so tables outside `tables` or unchanged since the last mirror
+    are carried over as-is. views are recreated once every table is in place, and the
+    served marts are exported as a matching parquet generation
+    """
+    if tables is None:
+        tables = MIRRORED_TABLES
+
+    db_path = get_frontend_db_path()
+    build_path = get_frontend_build_path()
+    generation_dir = get_frontend_parquet_dir() / build_path.stem.split(".")[-1]
+    print(f"building {build_path.name}...")
+    published = False
+    try:
+        if db_path.exists():
+            shutil.copyfile(db_path, build_path)
+
+        frontend_con = get_frontend_build_con(build_path, threads, memory_limit)
+        try:
+            mirrored_tables = write_backend_tables_to_frontend(
+                frontend_con, tables, max_workers
+            )
+            write_backend_views_to_frontend(frontend_con)
+            export_served_tables(
+                frontend_con,
+                generation_dir,
+                {i.table for i in mirrored_tables if i.strategy != "carried"},
+            )
+        finally:
+            close_frontend_build_con(frontend_con)
+        publish_frontend_db(build_path)
+        publish_frontend_parquet(generation_dir)
+        published = True
+    finally:
+        remove_frontend_build(build_path)
+        if not published:
+            shutil.rmtree(generation_dir, ignore_errors=True)
+
+    return mirrored_tables
 
 
 if __name__ == "__main__":
@@ -159,6 +159,31 @@ class PyPIDownload(SQLModel):
     retrieved_at: datetime.datetime
 
 
+# compact storage for `PyPIDownload`: the low-cardinality client details are stored
+# once per distinct combination and referenced from each hourly row by `dimension_id`
+class PyPIDownloadDimension(SQLModel):
+    __tablename__ = "pypi_download_dimensions"  # pyright: ignore [reportAssignmentType]
+    dimension_id: int = Field(primary_key=True)
+    country_code: str
+    package_version: str
+    python_version: str
+    system_distro_name: str
+    system_distro_version: str
+    system_name: str
+    system_release: str
+
+
+class PyPIDownloadFact(SQLModel):
+    __tablename__ = "pypi_download_facts"  # pyright: ignore [reportAssignmentType]
+    project: str = Field(primary_key=True, foreign_key="repo.repo_name")
+    timestamp: datetime.datetime = Field(primary_key=True)
+    dimension_id: int = Field(
+        primary_key=True, foreign_key="pypi_download_dimensions.dimension_id"
+    )
+    download_count: int
+    retrieved_at: datetime.datetime
+
+
 # used to track which repos have been queried to prevent repeated date range queries on repos with no downloads
 class PyPIQueryConfig(SQLModel):
     __tablename__ = "pypi_download_queries"  # pyright: ignore [reportAssignmentType]
@@ -166,6 +191,53 @@ class PyPIQueryConfig(SQLModel):
     retrieved_at: datetime.datetime = Field(primary_key=True)
     min_date: str
     max_date: Optional[str]
+    estimated_bytes: int = 0
+    bytes_processed: int = 0
+
+
+class PyPIQueryChunkStatus(StrEnum):
+    claimed = auto()
+    done = auto()
+    failed = auto()
+
+
+# append-only status events for backfill chunks - parallel runs claim a chunk before querying it,
+# skip chunks that are already done, and re-run chunks whose claim failed or went stale after a crash.
+# a restarted run of the same job takes over the claims its crashed run left behind
+class PyPIQueryChunk(SQLModel):
+    __tablename__ = "pypi_download_query_chunks"  # pyright: ignore [reportAssignmentType]
+    repo: str = Field(primary_key=True, foreign_key="repo.repo_name")
+    min_date: str = Field(primary_key=True)
+    max_date: str = Field(primary_key=True)
+    status: PyPIQueryChunkStatus = Field(primary_key=True)
+    run_id: str = Field(primary_key=True)
+    updated_at: datetime.datetime = Field(primary_key=True)
+    n_records: int = 0
+    job_id: Optional[str] = None
+
+
+# used to track the delta version produced by each bronze write so consumers can read only new files
+class DeltaTableVersion(SQLModel):
+    __tablename__ = "delta_table_versions"  # pyright: ignore [reportAssignmentType]
+    table_name: str = Field(primary_key=True)
+    version: int = Field(primary_key=True)
+    n_records: int
+    written_at: datetime.datetime
+
+
+# per-model timings parsed from the run_results.json of each dbt build
+class DbtModelTiming(SQLModel):
+    __tablename__ = "dbt_model_timings"  # pyright: ignore [reportAssignmentType]
+    invocation_id: str = Field(primary_key=True)
+    unique_id: str = Field(primary_key=True)
+    run_id: str
+    model_name: str
+    status: str
+    execution_time: float
+    completed_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    rows_affected: Optional[int] = None
+    bytes_scanned: Optional[int] = None
 
 
 # viz model dataclases
@@ -297,9 +369,9 @@ class ReposPublic(SQLModel):
 
 
 def get_repos_with_downloads_dev() -> list[str]:
-    from ampere.common import get_frontend_db_con
+    from ampere.common import get_frontend_parquet_con
 
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         repos = (
             con.sql(
                 """
@@ -332,9 +404,9 @@ def get_repos_with_downloads(env: str) -> list[str]:
 
 
 def get_repo_names_dev() -> list[str]:
-    from ampere.common import get_frontend_db_con
+    from ampere.common import get_frontend_parquet_con
 
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         repo_names = con.sql(
             "select repo_name from stg_repos order by stargazers_count desc"
         ).fetchall()
@@ -0,0 +1,383 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+import networkx as nx
+import numpy as np
+
+MAX_GRID_SIZE = 1024
+
+# an exact repulsion pair costs about as much as this many fft operations on the grid
+PAIR_COST = 10
+
+# pairs handled per chunk when computing exact repulsion
+FORCE_CHUNK_SIZE = 2_000_000
+
+
+@dataclass(slots=True, frozen=True)
+class CSRAdjacency:
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: np.ndarray
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+
+def build_csr_adjacency(
+    sources: np.ndarray, targets: np.ndarray, weights: np.ndarray, n_nodes: int
+) -> CSRAdjacency:
+    """
+    compressed sparse row adjacency over node indices, storing both directions of
+    every undirected edge
+    """
+    rows = np.concatenate([sources, targets])
+    cols = np.concatenate([targets, sources])
+    order = np.argsort(rows, kind="stable")
+
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_nodes), out=indptr[1:])
+    return CSRAdjacency(
+        indptr=indptr,
+        indices=cols[order],
+        weights=np.concatenate([weights, weights]).astype(float)[order],
+    )
+
+
+def graph_to_csr(
+    graph: nx.Graph, weight: str = "weight"
+) -> tuple[list[Any], CSRAdjacency]:
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array(
+        [(index[u], index[v], w) for u, v, w in graph.edges(data=weight, default=1)],
+        dtype=float,
+    ).reshape(-1, 3)
+    csr = build_csr_adjacency(
+        edges[:, 0].astype(np.int64),
+        edges[:, 1].astype(np.int64),
+        edges[:, 2],
+        len(nodes),
+    )
+    return nodes, csr
+
+
+@lru_cache(maxsize=4)
+def get_repulsion_kernel(grid_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    fourier transform of the repulsion (dx, dy) / (dx^2 + dy^2) between grid points one
+    cell apart, zero-padded to twice the grid so the convolution does not wrap
+    """
+    offsets = np.fft.fftfreq(2 * grid_size, 1 / (2 * grid_size))
+    dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+    r2 = dx**2 + dy**2
+    r2[0, 0] = 1
+    return np.fft.rfft2(dx / r2), np.fft.rfft2(dy / r2)
+
+
+def get_cic_weights(
+    pos: np.ndarray, lower: np.ndarray, cell_size: float, grid_size: int
+) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """flat grid indices and cloud-in-cell weights of the four points around each node"""
+    scaled = (pos - lower) / cell_size
+    corner = np.clip(np.floor(scaled), 0, grid_size - 2).astype(np.int64)
+    frac = scaled - corner
+
+    indices, weights = [], []
+    for di, dj in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+        indices.append((corner[:, 0] + di) * grid_size + corner[:, 1] + dj)
+        wx = frac[:, 0] if di else 1 - frac[:, 0]
+        wy = frac[:, 1] if dj else 1 - frac[:, 1]
+        weights.append(wx * wy)
+    return indices, weights
+
+
+def get_grid_field(
+    indices: list[np.ndarray], weights: list[np.ndarray], grid_size: int
+) -> list[np.ndarray]:
+    """
+    flattened x and y repulsion fields, in cell units, of the nodes spread onto the
+    grid with `get_cic_weights`
+    """
+    mass = np.zeros((2 * grid_size, 2 * grid_size))
+    mass[:grid_size, :grid_size] = sum(
+        np.bincount(i, w, minlength=grid_size**2) for i, w in zip(indices, weights)
+    ).reshape(grid_size, grid_size)
+    mass_fft = np.fft.rfft2(mass)
+
+    return [
+        np.fft.irfft2(mass_fft * kernel, s=mass.shape)[:grid_size, :grid_size].ravel()
+        for kernel in get_repulsion_kernel(grid_size)
+    ]
+
+
+def read_grid_field(
+    field: list[np.ndarray], indices: list[np.ndarray], weights: list[np.ndarray]
+) -> np.ndarray:
+    return np.column_stack(
+        [sum(axis[i] * w for i, w in zip(indices, weights)) for axis in field]
+    )
+
+
+def get_grid_repulsion(pos: np.ndarray, k: float, grid_size: int) -> np.ndarray:
+    """
+    approximates the fruchterman-reingold repulsion k^2 / d from every node with a
+    particle-mesh pass. nodes are spread onto a grid, the grid is convolved with the
+    repulsion kernel through an fft, and the field is read back at each node, so the
+    cost is O(n + g^2 log g) rather than O(n^2)
+    """
+    lower = pos.min(axis=0)
+    cell_size = max(float(np.ptp(pos, axis=0).max()), 1e-6) / (grid_size - 1)
+    indices, weights = get_cic_weights(pos, lower, cell_size, grid_size)
+    field = get_grid_field(indices, weights, grid_size)
+    return read_grid_field(field, indices, weights) * k * k / cell_size
+
+
+def get_grid_cost(grid_size: int) -> float:
+    """rough operation count of the ffts over the zero-padded grid in `get_grid_field`"""
+    n_cells = (2 * grid_size) ** 2
+    return n_cells * np.log2(n_cells)
+
+
+def get_pairwise_repulsion(pos: np.ndarray, k: float) -> np.ndarray:
+    """the exact fruchterman-reingold repulsion k^2 / d between every pair of nodes"""
+    repulsion = np.empty_like(pos)
+    chunk_size = max(1, FORCE_CHUNK_SIZE // len(pos))
+    for start in range(0, len(pos), chunk_size):
+        rows = slice(start, start + chunk_size)
+        delta = pos[rows, None, :] - pos[None, :, :]
+        distance2 = np.maximum(np.sum(delta**2, axis=-1), (0.01 * k) ** 2)
+        repulsion[rows] = np.einsum("ijk,ij->ik", delta, k * k / distance2)
+    return repulsion
+
+
+def get_csr_rows(csr: CSRAdjacency, rows: np.ndarray) -> CSRAdjacency:
+    """the adjacency of `rows` only, keeping the original node indices of neighbors"""
+    counts = np.diff(csr.indptr)[rows]
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    edges = np.repeat(csr.indptr[rows] - indptr[:-1], counts) + np.arange(indptr[-1])
+    return CSRAdjacency(
+        indptr=indptr, indices=csr.indices[edges], weights=csr.weights[edges]
+    )
+
+
+def get_csr_attraction(
+    pos: np.ndarray,
+    csr: CSRAdjacency,
+    k: float,
+    row_nodes: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    the fruchterman-reingold pull -w * d / k along every stored edge. `row_nodes`
+    maps the rows of a csr from `get_csr_rows` back to their node indices
+    """
+    rows = np.repeat(np.arange(csr.n_nodes), np.diff(csr.indptr))
+    row_pos = pos[rows] if row_nodes is None else pos[row_nodes[rows]]
+    delta = row_pos - pos[csr.indices]
+    distance = np.maximum(np.linalg.norm(delta, axis=-1), 0.01)
+    force = delta * (-csr.weights * distance / k)[:, None]
+    return np.column_stack(
+        [np.bincount(rows, force[:, i], minlength=csr.n_nodes) for i in range(2)]
+    )
+
+
+def grid_spring_layout(
+    graph: nx.Graph,
+    iterations: int = 50,
+    threshold: float = 1e-4,
+    weight: str = "weight",
+    seed: int = 42,
+) -> dict[Any, np.ndarray]:
+    """
+    drop-in for `nx.spring_layout` on large graphs. it follows the same
+    fruchterman-reingold schedule, with edges read from a csr adjacency and
+    repulsion approximated on a grid, and rescales the result to [-1, 1]
+    """
+    nodes, csr = graph_to_csr(graph, weight)
+    n_nodes = len(nodes)
+    if n_nodes == 0:
+        return {}
+    if n_nodes == 1:
+        return {nodes[0]: np.zeros(2)}
+
+    pos = np.random.default_rng(seed).random((n_nodes, 2))
+    k = np.sqrt(1 / n_nodes)
+    grid_size = int(np.clip(2 * np.sqrt(n_nodes), 16, MAX_GRID_SIZE))
+    t = float(np.ptp(pos, axis=0).max()) * 0.1
+    dt = t / (iterations + 1)
+
+    for _ in range(iterations):
+        displacement = get_grid_repulsion(pos, k, grid_size) + get_csr_attraction(
+            pos, csr, k
+        )
+        length = np.maximum(np.linalg.norm(displacement, axis=-1), 0.01)
+        delta_pos = displacement * (t / length)[:, None]
+        pos += delta_pos
+        t -= dt
+        if np.linalg.norm(delta_pos) / n_nodes < threshold:
+            break
+
+    pos -= pos.mean(axis=0)
+    pos /= max(float(np.abs(pos).max()), 1e-12)
+    return {node: pos[i] for i, node in enumerate(nodes)}
+
+
+def get_changed_nodes(graph: nx.Graph, previous_graph: nx.Graph) -> set[Any]:
+    """nodes that are new or whose neighbors differ from `previous_graph`"""
+    return {
+        node
+        for node in graph.nodes
+        if node not in previous_graph
+        or set(graph.adj[node]) != set(previous_graph.adj[node])
+    }
+
+
+def place_new_nodes(
+    graph: nx.Graph,
+    positions: dict[Any, np.ndarray],
+    new_nodes: set[Any],
+    k: float,
+    rng: np.random.Generator,
+) -> dict[Any, np.ndarray]:
+    """
+    starts each new node next to the centroid of its placed neighbors. new nodes only
+    connected to other new nodes are placed once one of those is, and anything left
+    unconnected starts at a random point inside the current bounds
+    """
+    positions = dict(positions)
+    coords = np.array(list(positions.values()))
+    lower, upper = coords.min(axis=0), coords.max(axis=0)
+
+    pending = [i for i in graph.nodes if i in new_nodes]
+    while len(pending) > 0:
+        unplaced = []
+        for node in pending:
+            neighbors = [positions[i] for i in graph.adj[node] if i in positions]
+            if len(neighbors) == 0:
+                unplaced.append(node)
+                continue
+            positions[node] = np.mean(neighbors, axis=0) + rng.normal(
+                scale=k * 0.1, size=2
+            )
+
+        if len(unplaced) == len(pending):
+            for node in unplaced:
+                positions[node] = rng.uniform(lower, upper)
+            break
+        pending = unplaced
+
+    return positions
+
+
+def refine_layout(
+    graph: nx.Graph,
+    positions: dict[Any, np.ndarray],
+    free_nodes: set[Any],
+    iterations: int = 50,
+    weight: str = "weight",
+) -> dict[Any, np.ndarray]:
+    """
+    fruchterman-reingold iterations that only move `free_nodes`, so they settle
+    beside their neighbors instead of drifting to where a full relayout would spread
+    them. the pinned nodes' repulsion field is computed once on a grid, so each
+    iteration only follows the free nodes' own edges and repels them from each
+    other, exactly when that costs less than a grid pass over them
+    """
+    nodes, csr = graph_to_csr(graph, weight)
+    index = {node: i for i, node in enumerate(nodes)}
+    pos = np.array([positions[i] for i in nodes], dtype=float)
+    free_idx = np.array([index[i] for i in free_nodes], dtype=np.int64)
+    pinned = np.ones(len(nodes), dtype=bool)
+    pinned[free_idx] = False
+    free_csr = get_csr_rows(csr, free_idx)
+
+    # the existing layout was rescaled after it was built, so its spacing k is taken
+    # as the one that balances the outward push of repulsion against the pull of the
+    # edges over the whole layout. iterations start cooler than a full layout since
+    # free nodes are already close to where they belong
+    grid_size = int(np.clip(2 * np.sqrt(len(nodes)), 16, MAX_GRID_SIZE))
+    width = max(float(np.ptp(pos, axis=0).max()), 0.01)
+    centered = pos - pos.mean(axis=0)
+    push = float(np.sum(centered * get_grid_repulsion(pos, 1, grid_size)))
+    pull = -float(np.sum(centered * get_csr_attraction(pos, csr, 1)))
+    k = np.cbrt(pull / push) if push > 0 and pull > 0 else width / np.sqrt(len(nodes))
+    t = k
+    dt = t / (iterations + 1)
+
+    # padded so free nodes pushed past the edge of the layout stay on the grid
+    lower = pos.min(axis=0) - 0.25 * width
+    cell_size = 1.5 * width / (grid_size - 1)
+    pinned_field = get_grid_field(
+        *get_cic_weights(pos[pinned], lower, cell_size, grid_size), grid_size
+    )
+    is_pairwise = len(free_idx) ** 2 * PAIR_COST < get_grid_cost(grid_size)
+
+    for _ in range(iterations):
+        indices, weights = get_cic_weights(pos[free_idx], lower, cell_size, grid_size)
+        if is_pairwise:
+            repulsion = (
+                read_grid_field(pinned_field, indices, weights) * k * k / cell_size
+            )
+            repulsion += get_pairwise_repulsion(pos[free_idx], k)
+        else:
+            free_field = get_grid_field(indices, weights, grid_size)
+            field = [i + j for i, j in zip(pinned_field, free_field)]
+            repulsion = read_grid_field(field, indices, weights) * k * k / cell_size
+
+        displacement = repulsion + get_csr_attraction(pos, free_csr, k, free_idx)
+
+        length = np.maximum(np.linalg.norm(displacement, axis=-1), 0.01 * k)
+        pos[free_idx] += displacement * (np.minimum(length, t) / length)[:, None]
+        t -= dt
+
+    return {node: pos[i] for i, node in enumerate(nodes)}
+
+
+def incremental_spring_layout(
+    graph: nx.Graph,
+    previous_graph: Optional[nx.Graph],
+    max_churn: float = 0.25,
+    iterations: int = 50,
+    seed: int = 42,
+) -> dict[Any, np.ndarray]:
+    """
+    positions for `graph` that keep nodes carried over from `previous_graph` where they
+    were. new nodes start next to their neighbors and are relaxed around the pinned
+    existing layout. falls back to a full grid layout without a previous layout or
+    when more than `max_churn` of the nodes are new or changed edges. nodes whose
+    edges changed are relaxed along with the new ones
+    """
+    n_nodes = graph.number_of_nodes()
+    if n_nodes == 0:
+        return {}
+
+    previous_positions = (
+        {} if previous_graph is None else nx.get_node_attributes(previous_graph, "pos")
+    )
+    new_nodes = {i for i in graph.nodes if i not in previous_positions}
+    changed_nodes = new_nodes
+    if previous_graph is not None:
+        changed_nodes = changed_nodes | get_changed_nodes(graph, previous_graph)
+
+    churn = len(changed_nodes) / n_nodes
+    if len(previous_positions) == 0 or churn > max_churn:
+        print(f"full layout - {churn:.1%} of {n_nodes:,} nodes changed")
+        return grid_spring_layout(graph, iterations=iterations, seed=seed)
+
+    print(f"incremental layout - {len(changed_nodes):,}/{n_nodes:,} nodes changed")
+    positions = {
+        i: np.asarray(previous_positions[i], dtype=float)
+        for i in graph.nodes
+        if i not in new_nodes
+    }
+    if len(changed_nodes) == 0:
+        return positions
+
+    coords = np.array(list(positions.values()))
+    k = max(float(np.ptp(coords, axis=0).max()), 0.01) / np.sqrt(n_nodes)
+    positions = place_new_nodes(
+        graph, positions, new_nodes, k, np.random.default_rng(seed)
+    )
+    return refine_layout(graph, positions, changed_nodes, iterations)
@@ -2,7 +2,7 @@ import dash_bootstrap_components as dbc
 import pandas as pd
 from dash import Input, Output, callback, dash_table, html
 
-from ampere.common import get_frontend_db_con, timeit
+from ampere.common import get_frontend_parquet_con, timeit
 from ampere.styling import (
     ScreenWidth,
     get_ampere_colors,
@@ -12,7 +12,7 @@ from ampere.styling import (
 
 @timeit
 def create_repo_table() -> pd.DataFrame:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         df = con.sql(
             """
         with downloads_total as (
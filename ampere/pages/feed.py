@@ -2,12 +2,12 @@ import dash_bootstrap_components as dbc
 import pandas as pd
 from dash import Input, Output, callback, dash_table, html
 
-from ampere.common import get_frontend_db_con
+from ampere.common import get_frontend_parquet_con
 from ampere.styling import AmperePalette, ScreenWidth, get_ampere_dt_style
 
 
 def create_feed_table() -> pd.DataFrame:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         df = con.sql(
             """    
         select
@@ -4,7 +4,7 @@ import dash_bootstrap_components as dbc
 import pandas as pd
 from dash import Input, Output, callback, dash_table, html
 
-from ampere.common import get_frontend_db_con, timeit
+from ampere.common import get_frontend_parquet_con, timeit
 from ampere.styling import (
     ColumnInfo,
     ScreenWidth,
@@ -15,7 +15,7 @@ from ampere.styling import (
 
 
 def create_issues_table() -> pd.DataFrame:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         df = con.sql(
             """
        select
@@ -34,7 +34,7 @@ def create_issues_table() -> pd.DataFrame:
 
 
 def create_issues_summary_table() -> pd.DataFrame:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         df = con.sql(
             """
         select repo,
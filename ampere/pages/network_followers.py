@@ -4,7 +4,7 @@ import dash_bootstrap_components as dbc
 import pandas as pd
 from dash import Input, Output, callback, dash_table, dcc, html
 
-from ampere.common import get_frontend_db_con, timeit
+from ampere.common import get_frontend_parquet_con, timeit
 from ampere.styling import ScreenWidth, get_ampere_dt_style
 from ampere.viz import (
     read_plotly_fig_pickle,
@@ -14,7 +14,7 @@ from ampere.viz import (
 
 @timeit
 def create_followers_table() -> pd.DataFrame:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         df = con.sql(
             """
         select
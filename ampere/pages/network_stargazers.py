@@ -4,13 +4,13 @@ import dash_bootstrap_components as dbc
 import pandas as pd
 from dash import Input, Output, callback, dash_table, dcc, html
 
-from ampere.common import get_frontend_db_con, timeit
+from ampere.common import get_frontend_parquet_con, timeit
 from ampere.styling import ScreenWidth, get_ampere_dt_style
 from ampere.viz import read_plotly_fig_pickle, viz_star_network
 
 
 def create_stargazers_table() -> pd.DataFrame:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         # select * because columns are dynamically generated
         df = con.sql(
             """
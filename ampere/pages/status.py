@@ -48,6 +48,25 @@ def create_status_details_table() -> pd.DataFrame:
     return df
 
 
+def create_status_dbt_timings_table() -> pd.DataFrame:
+    with get_frontend_db_con() as con:
+        df = con.sql(
+            """
+        select
+            replace(model_name, '_', ' ') as "model",
+            concat(strftime(completed_at, '%Y-%m-%d %H:%M:%S'), ' (UTC)') as "last build",
+            execution_time as "runtime (s)",
+            trailing_median_execution_time as "trailing median (s)",
+            pct_change as "change (%)",
+            avg_execution_time_7d as "7d avg (s)",
+            pct_change_7d as "7d change (%)"
+        from mart_status_dbt_timings
+        order by execution_time desc
+        """
+        ).to_df()
+    return df
+
+
 @callback(
     Output("status-fade", "is_in"),
     Input("status-table", "id"),
@@ -161,6 +180,48 @@ def get_styled_details_table(dark_mode: bool, breakpoint_name: str):
     return tbl, {}
 
 
+@callback(
+    [
+        Output("status-dbt-timings-table", "children"),
+        Output("status-dbt-timings-table", "style"),
+    ],
+    [
+        Input("color-mode-switch", "value"),
+        Input("breakpoints", "widthBreakpoint"),
+    ],
+)
+def get_styled_dbt_timings_table(dark_mode: bool, breakpoint_name: str):
+    timings_df = create_status_dbt_timings_table()
+    timings_style = get_ampere_dt_style(dark_mode)
+    lg_margins = {
+        "maxWidth": "50vw",
+        "width": "50vw",
+        "marginLeft": "20vw",
+    }
+
+    sm_margins = {
+        "maxWidth": "90vw",
+        "width": "90vw",
+        "marginLeft": "0vw",
+    }
+
+    timings_style["style_table"].update({"height": "50vh", "maxHeight": "50vh"})
+    if breakpoint_name in [ScreenWidth.xs, ScreenWidth.sm]:
+        timings_style["style_table"].update(sm_margins)
+        timings_style["style_cell"]["font_size"] = "12px"
+
+    else:
+        timings_style["style_table"].update(lg_margins)
+
+    tbl = dash_table.DataTable(
+        timings_df.to_dict("records"),
+        columns=[{"id": x, "name": x} for x in timings_df.columns],
+        **timings_style,
+    )
+
+    return tbl, {}
+
+
 def layout():
     return [
         dbc.Fade(
@@ -169,6 +230,8 @@ def layout():
                 html.Div(id="status-summary-table", style={"visibility": "hidden"}),
                 html.Br(),
                 html.Div(id="status-details-table", style={"visibility": "hidden"}),
+                html.Br(),
+                html.Div(id="status-dbt-timings-table", style={"visibility": "hidden"}),
             ],
             style={"transition": "opacity 200ms ease-in", "minHeight": "100vh"},
             is_in=False,
@@ -6,6 +6,7 @@ from pathlib import Path
 from typing import Any, Optional
 
 import networkx as nx
+import numpy as np
 import pandas as pd
 import plotly
 import plotly.express as px
@@ -13,7 +14,7 @@ import plotly.graph_objects as go
 import pypalettes
 from plotly.graph_objs import Figure
 
-from ampere.common import get_frontend_db_con, timeit
+from ampere.common import get_frontend_parquet_con, timeit
 from ampere.get_repo_metrics import read_repos
 from ampere.models import (
     FollowerDetails,
@@ -25,7 +26,7 @@ from ampere.styling import AmperePalette, ScreenWidth, get_ampere_colors
 
 @timeit
 def generate_repo_palette() -> dict[str, str]:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         repos = sorted(
             read_repos(con),
             key=lambda x: x.stargazers_count,
@@ -237,7 +238,7 @@ def viz_summary(
 
 
 def get_summary_data() -> pd.DataFrame:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         df = con.sql(
             """
         select
@@ -255,7 +256,7 @@ def get_summary_data() -> pd.DataFrame:
 
 @timeit
 def get_downloads_data(repo_name: str) -> pd.DataFrame:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         df = con.sql(
             f"""
             select
@@ -326,68 +327,61 @@ def create_star_network_plot(
         edge_color = "rgba(33, 33, 33, 0.3)"
         legend_text_color = AmperePalette.BRAND_TEXT_COLOR_LIGHT
 
-    edge_x = []
-    edge_y = []
-    for edge in graph.edges():
-        if edge[0] in repos:
-            continue
+    pos = nx.get_node_attributes(graph, "pos")
 
-        x0, y0 = graph.nodes[edge[0]]["pos"]
-        x1, y1 = graph.nodes[edge[1]]["pos"]
-
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
+    # repos are added to the graph first, so their spokes are the edges listed from
+    # the repo's side and only edges between a user's stars are drawn
+    repo_set = set(repos)
+    edge_coords = np.array(
+        [(pos[u], pos[v]) for u, v in graph.edges() if u not in repo_set]
+    ).reshape(-1, 2, 2)
+    gaps = np.full(len(edge_coords), np.nan)
+    edge_x = np.column_stack([edge_coords[:, 0, 0], edge_coords[:, 1, 0], gaps])
+    edge_y = np.column_stack([edge_coords[:, 0, 1], edge_coords[:, 1, 1], gaps])
 
     edge_trace = go.Scatter(
-        x=edge_x,
-        y=edge_y,
+        x=edge_x.ravel(),
+        y=edge_y.ravel(),
         line=dict(width=1, color=edge_color),
         hoverinfo="none",
         mode="lines",
         showlegend=False,
     )
 
-    node_info = []
-    for node in graph.nodes():
-        node_data = graph.nodes.data()[node]
-        repo = node_data["repo"]
-        if node == repo:
-            continue
-
-        x, y = graph.nodes[node]["pos"]
-        followers_count = node_data["followers_count"]
-        user_name = node.split("_")[0]
-
-        all_repos = [i.repo_name for i in stargazers if i.user_name == user_name]
-
-        all_repos_text = ", ".join(all_repos)
-
-        node_text_list = [
-            f"<b> {user_name} </b>",
-            "",
-            f"followers: {followers_count}",
-            f"repos: {all_repos_text}",
-        ]
-
-        node_text = "<br>".join(node_text_list)
-        node_info.append(
-            {
-                "x": x,
-                "y": y,
-                "repo": repo,
-                "text": node_text,
-                "size": followers_count,
-            }
-        )
-
-    node_df = pd.DataFrame(node_info)
+    repos_by_user: dict[str, list[str]] = {}
+    for stargazer in stargazers:
+        repos_by_user.setdefault(stargazer.user_name, []).append(stargazer.repo_name)
+    repos_text_by_user = {user: ", ".join(i) for user, i in repos_by_user.items()}
+
+    user_nodes = [
+        (node, data) for node, data in graph.nodes(data=True) if node != data["repo"]
+    ]
+    node_coords = np.array([pos[node] for node, _ in user_nodes]).reshape(-1, 2)
+    node_df = pd.DataFrame(
+        {
+            "x": node_coords[:, 0],
+            "y": node_coords[:, 1],
+            "repo": [data["repo"] for _, data in user_nodes],
+            "user_name": [node.split("_")[0] for node, _ in user_nodes],
+            "size": [data["followers_count"] for _, data in user_nodes],
+        }
+    )
+    node_df["text"] = (
+        "<b> "
+        + node_df["user_name"]
+        + " </b><br><br>followers: "
+        + node_df["size"].astype(str)
+        + "<br>repos: "
+        + node_df["user_name"].map(repos_text_by_user).fillna("")
+    )
     node_df["size_group"] = pd.qcut(node_df["size"], 6, labels=False, duplicates="drop")
     node_df["size_group"] = (node_df["size_group"] + 1) * 5
 
     repo_palette = generate_repo_palette()
+    repo_dfs = dict(tuple(node_df.groupby("repo", sort=False)))
     all_node_traces = []
     for repo in repos:
-        repo_df = node_df.query(f"repo == '{repo}'")
+        repo_df = repo_dfs.get(repo, node_df.iloc[0:0])
         node_trace = go.Scatter(
             x=repo_df.x,
             y=repo_df.y,
@@ -421,7 +415,7 @@ def create_star_network_plot(
 
 @timeit
 def viz_star_network(dark_mode: bool, screen_width: ScreenWidth) -> Figure:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         stargazers = con.sql(
             """
         select
@@ -459,80 +453,73 @@ def create_follower_network_plot(
         edge_color = "rgba(33, 33, 33, 0.5)"
         legend_text_color = AmperePalette.BRAND_TEXT_COLOR_LIGHT
 
-    all_connections = [(i.user_id, i.follower_id) for i in follower_info]
-    solo_edges = {"x": [], "y": []}
-    mutual_edges = {"x": [], "y": []}
-    for edge in graph.edges():
-        followed = edge[0]
-        follower = edge[1]
-
-        is_mutual = (follower, followed) in all_connections
-        x0, y0 = graph.nodes[followed]["pos"]
-        x1, y1 = graph.nodes[follower]["pos"]
-
-        if is_mutual:
-            mutual_edges["x"].extend([x0, x1, None])
-            mutual_edges["y"].extend([y0, y1, None])
-        else:
-            solo_edges["x"].extend([x0, x1, None])
-            solo_edges["y"].extend([y0, y1, None])
-
-    solo_edge_trace = go.Scatter(
-        x=solo_edges["x"],
-        y=solo_edges["y"],
-        line=dict(width=1, color=edge_color),
-        hoverinfo="none",
-        mode="lines",
-        name="solo connection",
+    pos = nx.get_node_attributes(graph, "pos")
+    edges = np.array(list(graph.edges()), dtype=np.int64).reshape(-1, 2)
+    edge_coords = np.array([(pos[u], pos[v]) for u, v in edges]).reshape(-1, 2, 2)
+
+    # an edge is mutual when both directions appear among the connections, looked up
+    # as structured (user, follower) pairs against the sorted connection pairs
+    pair_dtype = np.dtype([("user_id", np.int64), ("follower_id", np.int64)])
+    connections = np.array(
+        [(i.user_id, i.follower_id) for i in follower_info], dtype=np.int64
+    ).reshape(-1, 2)
+    connection_keys = np.unique(connections.view(pair_dtype).ravel())
+    edge_keys = np.ascontiguousarray(edges).view(pair_dtype).ravel()
+    reversed_edge_keys = np.ascontiguousarray(edges[:, ::-1]).view(pair_dtype).ravel()
+    is_mutual = np.isin(edge_keys, connection_keys) & np.isin(
+        reversed_edge_keys, connection_keys
     )
-    mutual_edge_trace = go.Scatter(
-        x=mutual_edges["x"],
-        y=mutual_edges["y"],
-        line=dict(width=1, color="rgb(247, 111, 83)"),
-        hoverinfo="none",
-        mode="lines",
-        name="mutual connection",
+
+    def get_edge_trace(mask: np.ndarray, color: str, name: str) -> go.Scatter:
+        gaps = np.full(mask.sum(), np.nan)
+        edge_x = np.column_stack([edge_coords[mask, 0, 0], edge_coords[mask, 1, 0], gaps])
+        edge_y = np.column_stack([edge_coords[mask, 0, 1], edge_coords[mask, 1, 1], gaps])
+        return go.Scatter(
+            x=edge_x.ravel(),
+            y=edge_y.ravel(),
+            line=dict(width=1, color=color),
+            hoverinfo="none",
+            mode="lines",
+            name=name,
+        )
+
+    solo_edge_trace = get_edge_trace(~is_mutual, edge_color, "solo connection")
+    mutual_edge_trace = get_edge_trace(
+        is_mutual, "rgb(247, 111, 83)", "mutual connection"
     )
 
-    node_info = []
-    for node in graph.nodes():
-        x, y = graph.nodes[node]["pos"]
-        node_details = follower_details[node]
-        node_text_list = [
-            "<b>" + node_details.user_name + "</b>",
-            "",
-            f"org followers: {node_details.internal_followers_count}/{node_details.followers_count} ({node_details.internal_followers_pct * 100:.02f}%)",
-            f"org following: {node_details.internal_following_count}/{node_details.following_count} ({node_details.internal_following_pct * 100:.02f}%)",
-        ]
-
-        internal_followers_clean = format_plot_name_list(node_details.followers)
-        internal_following_clean = format_plot_name_list(node_details.following)
-
-        if internal_followers_clean is not None or internal_following_clean is not None:
-            node_text_list += [""]
-
-        if internal_followers_clean is not None:
-            node_text_list += [f"followers: {internal_followers_clean}"]
-
-        if internal_following_clean is not None:
-            node_text_list += [f"following: {internal_following_clean}"]
-
-        node_text = "<br>".join(node_text_list)
-        node_info.append(
-            {
-                "x": x,
-                "y": y,
-                "text": node_text,
-                "followers_count": node_details.followers_count,
-                "internal_followers_count": node_details.internal_followers_count,
-                "internal_followers_pct": node_details.internal_followers_pct,
-                "following_count": node_details.following_count,
-                "internal_following_count": node_details.internal_following_count,
-                "internal_following_pct": node_details.internal_following_pct,
-            }
+    nodes = list(graph.nodes())
+    node_coords = np.array([pos[i] for i in nodes]).reshape(-1, 2)
+    node_df = pd.DataFrame([follower_details[i] for i in nodes])
+    node_df["x"] = node_coords[:, 0]
+    node_df["y"] = node_coords[:, 1]
+
+    def get_count_text(count_col: str, pct_col: str) -> pd.Series:
+        internal_col = f"internal_{count_col}"
+        return (
+            node_df[internal_col].astype(str)
+            + "/"
+            + node_df[count_col].astype(str)
+            + " ("
+            + (node_df[pct_col] * 100).map("{:.02f}".format)
+            + "%)"
         )
 
-    node_df = pd.DataFrame(node_info)
+    followers_text = node_df["followers"].map(format_plot_name_list)
+    following_text = node_df["following"].map(format_plot_name_list)
+    has_names = followers_text.notna() | following_text.notna()
+    node_df["text"] = (
+        "<b>"
+        + node_df["user_name"]
+        + "</b><br><br>org followers: "
+        + get_count_text("followers_count", "internal_followers_pct")
+        + "<br>org following: "
+        + get_count_text("following_count", "internal_following_pct")
+        + np.where(has_names, "<br>", "")
+        + ("<br>followers: " + followers_text).fillna("")
+        + ("<br>following: " + following_text).fillna("")
+    )
+
     node_df["followers_group"] = pd.qcut(
         node_df["followers_count"],
         10,
@@ -578,7 +565,7 @@ def create_follower_network_plot(
 
 @timeit
 def viz_follower_network(dark_mode: bool, screen_width: ScreenWidth) -> Figure:
-    with get_frontend_db_con() as con:
+    with get_frontend_parquet_con() as con:
         followers = (
             con.sql("select user_id, follower_id from int_internal_followers")
             .to_df()
@@ -0,0 +1,79 @@
+{{
+    config(
+        meta={
+            'dagster': {
+                'ref': {
+                    'name': 'int_downloads_melted',
+                    'package_name': 'ampere'
+                },
+            }
+        }
+    )
+}}
+-- the single pass unpivot must match the original one-branch-per-dimension melt
+with
+base as (
+    select *
+    from {{ ref('stg_pypi_downloads') }}
+    where
+        timestamp >= (
+            select max(timestamp) - interval 7 days
+            from {{ ref('stg_pypi_downloads') }}
+        )
+),
+
+unpivoted as (
+    {{ unpivot_downloads('base') }}
+),
+
+melted as (
+    {%- for col in [
+        'country_code',
+        'package_version',
+        'python_version',
+        'system_distro_name',
+        'system_distro_version',
+        'system_name',
+        'system_release'
+    ] %}
+    select
+        project,
+        timestamp,
+        '{{ col }}' as group_name,
+        {{ col }} as group_value,
+        download_count
+    from base
+    {%- if not loop.last %}
+    union all
+    {%- endif %}
+    {%- endfor %}
+),
+
+summed as (
+    select
+        project as repo,
+        timestamp as download_timestamp,
+        group_name,
+        group_value,
+        sum(download_count)::uinteger as download_count
+    from melted
+    group by all
+),
+
+union_all as (
+    select * from summed
+    union all
+    select
+        repo,
+        download_timestamp,
+        'overall' as group_name,
+        'overall' as group_value,
+        sum(download_count)::uinteger as download_count
+    from summed
+    where group_name = 'system_name'
+    group by all
+)
+
+(select * from unpivoted except select * from union_all)
+union all
+(select * from union_all except select * from unpivoted)
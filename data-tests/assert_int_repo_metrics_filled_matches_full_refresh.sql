@@ -0,0 +1,92 @@
+{{
+    config(
+        meta={
+            'dagster': {
+                'ref': {
+                    'name': 'int_repo_metrics_filled',
+                    'package_name': 'ampere'
+                },
+            }
+        }
+    )
+}}
+-- each weekly row must hold the highest end of day count in its week, filled down
+-- from the last day with metrics, for every repo/metric a full refresh would build
+with
+daily_counts as (
+    select
+        repo_id,
+        metric_type,
+        time_bucket('1 day', metric_timestamp)::date as metric_date,
+        sum(metric_delta) as metric_delta
+    from {{ ref('int_repo_metrics') }}
+    group by all
+),
+
+running_counts as (
+    select
+        repo_id,
+        metric_type,
+        metric_date,
+        sum(metric_delta) over (
+            partition by repo_id, metric_type
+            order by metric_date
+        ) as metric_count
+    from daily_counts
+),
+
+pairs as (
+    select
+        a.repo_id,
+        b.metric_type
+    from (select distinct repo_id from {{ ref('int_repo_metrics') }}) as a
+    cross join (select distinct metric_type from {{ ref('int_repo_metrics') }}) as b
+),
+
+spine as (
+    select
+        a.repo_id,
+        a.metric_type,
+        b.spine_date as metric_date
+    from pairs as a
+    cross join {{ ref('helper_date_spine') }} as b
+),
+
+filled as (
+    select
+        a.repo_id,
+        a.metric_type,
+        a.metric_date,
+        b.metric_count
+    from spine as a
+    asof left join running_counts as b
+        on a.repo_id = b.repo_id
+        and a.metric_type = b.metric_type
+        and a.metric_date >= b.metric_date
+),
+
+full_refresh as (
+    select
+        repo_id,
+        metric_type,
+        time_bucket(interval 7 day, metric_date) as metric_date,
+        max(metric_count)::bigint as metric_count
+    from filled
+    group by all
+),
+
+incremental as (
+    select
+        repo_id,
+        metric_type,
+        metric_date,
+        metric_count
+    from {{ ref('int_repo_metrics_filled') }}
+    where
+        metric_date = time_bucket(interval 7 day, metric_date)
+        and metric_date <= (select max(spine_date) from {{ ref('helper_date_spine') }})
+)
+
+(select * from full_refresh except all select * from incremental)
+union all
+(select * from incremental except all select * from full_refresh)
@@ -0,0 +1,47 @@
+{{
+    config(
+        meta={
+            'dagster': {
+                'ref': {
+                    'name': 'int_repo_metrics',
+                    'package_name': 'ampere'
+                },
+            }
+        }
+    )
+}}
+-- incremental runs must leave the same rows a full refresh would count from staging
+with
+{{ repo_metric_events() }},
+
+full_refresh as (
+    select
+        repo_id,
+        metric_type,
+        metric_timestamp,
+        metric_id,
+        user_id,
+        sum(metric_delta) over (
+            partition by repo_id, metric_type
+            order by metric_timestamp, metric_id, user_id nulls first, metric_delta
+            rows between unbounded preceding and current row
+        )::bigint as metric_count,
+        metric_delta
+    from events
+),
+
+incremental as (
+    select
+        repo_id,
+        metric_type,
+        metric_timestamp,
+        metric_id,
+        user_id,
+        metric_count,
+        metric_delta
+    from {{ ref('int_repo_metrics') }}
+)
+
+(select * from full_refresh except all select * from incremental)
+union all
+(select * from incremental except all select * from full_refresh)
@@ -0,0 +1,153 @@
+{#
+    incremental reads of bronze delta tables
+
+    bronze tables are append-mostly, so an incremental model only needs the parquet
+    files added by delta versions it has not consumed yet. the consumed version is
+    stored per model in `delta_consumer_offsets` by `record_delta_offset`, which must
+    run as a post-hook so the offset only advances once the model has been built.
+
+    both macros only consider versions committed before `run_started_at` so the
+    files read by the model and the offset recorded afterwards always agree, even
+    if another job appends to the table mid-build.
+#}
+
+{% macro create_delta_consumer_offsets() %}
+    {% do run_query(
+        "create table if not exists delta_consumer_offsets ("
+        ~ "consumer varchar, table_path varchar, version bigint, "
+        ~ "consumed_at timestamp with time zone)"
+    ) %}
+{% endmacro %}
+
+
+{% macro get_delta_consumer_offset(table_path) %}
+    {% do create_delta_consumer_offsets() %}
+    {% set offset_query %}
+        select max(version)
+        from delta_consumer_offsets
+        where consumer = '{{ this.name }}' and table_path = '{{ table_path }}'
+    {% endset %}
+    {{ return(run_query(offset_query).columns[0].values()[0]) }}
+{% endmacro %}
+
+
+{% macro get_delta_log_state(table_path, starting_version) %}
+    {% set cutoff_ms = (run_started_at.timestamp() * 1000) | int %}
+    {% set state_query %}
+        with
+        delta_log as (
+            select
+                regexp_extract(filename, '(\d+)\.json$', 1)::bigint as version,
+                commitinfo.timestamp as commit_ms,
+                add.path as file_path,
+                add.datachange as data_change
+            from read_json(
+                '{{ table_path }}/_delta_log/*.json',
+                columns = {
+                    'commitInfo': 'struct("timestamp" bigint)',
+                    'add': 'struct(path varchar, dataChange boolean)'
+                },
+                filename = true,
+                format = 'newline_delimited'
+            )
+        ),
+
+        committed_versions as (
+            select version
+            from delta_log
+            group by version
+            having coalesce(max(commit_ms), 0) <= {{ cutoff_ms }}
+        ),
+
+        existing_files as (
+            select parse_filename(file) as file_path
+            from glob('{{ table_path }}/*.parquet')
+        ),
+
+        new_files as (
+            select
+                a.file_path,
+                b.file_path is not null as file_exists
+            from delta_log as a
+            left join existing_files as b on a.file_path = b.file_path
+            where
+                a.version > {{ starting_version }}
+                and a.version in (select c.version from committed_versions as c)
+                and a.file_path is not null
+                and a.data_change
+        )
+
+        select
+            (select min(version) from delta_log) as min_version,
+            (select max(version) from committed_versions) as max_version,
+            (select string_agg(file_path, ',') from new_files) as file_paths,
+            (select count(*) from new_files where not file_exists) as missing_files
+    {% endset %}
+
+    {% set row = run_query(state_query).rows[0] %}
+    {{ return({
+        'min_version': row[0],
+        'max_version': row[1],
+        'file_paths': row[2].split(',') if row[2] else [],
+        'missing_files': row[3],
+    }) }}
+{% endmacro %}
+
+
+{% macro get_delta_new_files(table_path) %}
+    {#- returns none whenever the new files can't be identified -#}
+    {%- set offset = get_delta_consumer_offset(table_path) -%}
+    {%- if offset is none -%}
+        {{ return(none) }}
+    {%- endif -%}
+
+    {%- set state = get_delta_log_state(table_path, offset) -%}
+
+    {#- log cleanup or vacuum removed versions this model never consumed -#}
+    {%- if state.min_version > offset + 1 or state.missing_files > 0 -%}
+        {{ log(this.name ~ ": delta history for " ~ table_path ~ " since version "
+            ~ offset ~ " is incomplete", info=true) }}
+        {{ return(none) }}
+    {%- endif -%}
+
+    {{ log(this.name ~ ": reading " ~ state.file_paths | length ~ " new files from "
+        ~ table_path ~ " (versions " ~ offset ~ " -> " ~ state.max_version ~ ")",
+        info=true) }}
+
+    {%- set file_uris = [] -%}
+    {%- for file_path in state.file_paths -%}
+        {%- do file_uris.append("'" ~ table_path ~ "/" ~ file_path ~ "'") -%}
+    {%- endfor -%}
+    {{ return(file_uris) }}
+{% endmacro %}
+
+
+{% macro delta_incremental_scan(source_relation, table_path) %}
+    {#- falls back to the full source whenever the new files can't be identified -#}
+    {%- if not execute or not is_incremental() -%}
+        {{ return(source_relation) }}
+    {%- endif -%}
+
+    {%- set file_uris = get_delta_new_files(table_path) -%}
+    {%- if file_uris is none -%}
+        {{ return(source_relation) }}
+    {%- endif -%}
+
+    {%- if file_uris | length == 0 -%}
+        {{ return("(select * from " ~ source_relation ~ " where false)") }}
+    {%- endif -%}
+
+    {{ return("read_parquet([" ~ file_uris | join(", ") ~ "], union_by_name = true)") }}
+{% endmacro %}
+
+
+{% macro record_delta_offset(table_path) %}
+    {%- if execute -%}
+        {%- do create_delta_consumer_offsets() -%}
+        {%- set state = get_delta_log_state(table_path, -1) -%}
+        {%- if state.max_version is not none -%}
+            insert into delta_consumer_offsets
+            values ('{{ this.name }}', '{{ table_path }}', {{ state.max_version }}, now())
+        {%- endif -%}
+    {%- endif -%}
+{% endmacro %}
@@ -0,0 +1,23 @@
+{#
+    incremental feed event models only re-derive events at or after their
+    repo/type/action watermark in the `watermarks` cte. a repo/type/action with no
+    watermark yet, such as a newly tracked repo, gets its full history.
+    `timestamp_col` must be qualified with the `a` alias the repo id is read from
+#}
+{% macro after_feed_watermark(event_type, event_action, timestamp_col) %}
+    {%- if is_incremental() -%}
+    coalesce(
+        {{ timestamp_col }} >= (
+            select w.min_event_timestamp
+            from watermarks as w
+            where
+                w.repo_id = a.repo_id
+                and w.event_type = '{{ event_type }}'
+                and w.event_action = '{{ event_action }}'
+        ),
+        true
+    )
+    {%- else -%}
+    true
+    {%- endif -%}
+{% endmacro %}
@@ -0,0 +1,59 @@
+{#
+    hourly timestamp windows covered by `pypi_download_queries` entries added since
+    the model last ran. each entry queried whole utc days from `min_date` through
+    `max_date`, so any row it wrote falls in [min_date, max_date + 1 day).
+    returns none when the new ledger entries can't be identified
+#}
+{% macro pypi_query_windows(ledger_path) %}
+    {%- if not execute or not is_incremental() -%}
+        {{ return(none) }}
+    {%- endif -%}
+
+    {%- set file_uris = get_delta_new_files(ledger_path) -%}
+    {%- if file_uris is none -%}
+        {{ return(none) }}
+    {%- endif -%}
+
+    {%- if file_uris | length == 0 -%}
+        {{ return(
+            "(select null::varchar as project, null::timestamptz as min_timestamp, "
+            ~ "null::timestamptz as max_timestamp where false)"
+        ) }}
+    {%- endif -%}
+
+    {%- set windows_query -%}
+        (
+            select distinct
+                repo as project,
+                timezone('UTC', min_date::date::timestamp) as min_timestamp,
+                timezone(
+                    'UTC',
+                    (coalesce(max_date::date, current_date) + 1)::timestamp
+                ) as max_timestamp
+            from read_parquet([{{ file_uris | join(", ") }}], union_by_name = true)
+        )
+    {%- endset -%}
+    {{ return(windows_query) }}
+{% endmacro %}
+
+
+{#
+    `download_timestamp` windows an incremental downloads model has to rebuild: the
+    days covered by `pypi_download_queries` entries it has not consumed yet, so
+    backfilled history is re-rolled, plus everything from its latest built day. a
+    null `repo` applies to every repo. models using this must record their ledger
+    offset with `record_delta_offset` in a post-hook
+#}
+{% macro downloads_touched_windows(ledger_path) %}
+    {%- set query_windows = pypi_query_windows(ledger_path) -%}
+    {%- if query_windows is not none %}
+    select project as repo, min_timestamp, max_timestamp
+    from {{ query_windows }}
+    union all
+    {%- endif %}
+    select
+        null::varchar as repo,
+        coalesce(max(download_timestamp), date '1900-01-01') as min_timestamp,
+        'infinity'::timestamptz as max_timestamp
+    from {{ this }}
+{% endmacro %}
@@ -0,0 +1,191 @@
+{#
+    ctes that turn the github staging models into repo metric events, each a
+    signed delta to its repo/metric's running count, ending in an `events` cte.
+    `repos` names a cte with a repo_id column to limit every staging read to
+#}
+{% macro repo_metric_events(repos=none) %}
+{%- for source_model in [
+    'stg_stargazers',
+    'stg_issues',
+    'stg_pull_requests',
+    'stg_forks',
+    'stg_commits'
+] %}
+metric_{{ source_model[4:] }} as (
+    select *
+    from {{ ref(source_model) }}
+    {%- if repos is not none %}
+    where repo_id in (select repo_id from {{ repos }})
+    {%- endif %}
+),
+{% endfor %}
+
+star_events as (
+    select
+        repo_id,
+        'stars' as metric_type,
+        null as metric_id,
+        starred_at as metric_timestamp,
+        user_id,
+        (user_id is not null)::int as metric_delta
+    from metric_stargazers
+),
+
+issue_events_open as (
+    select
+        repo_id,
+        'issues' as metric_type,
+        issue_id as metric_id,
+        created_at as metric_timestamp,
+        author_id as user_id,
+        1 as metric_delta
+    from metric_issues
+    where created_at is not null
+),
+
+issue_events_closed as (
+    select
+        repo_id,
+        'issues' as metric_type,
+        issue_id as metric_id,
+        closed_at as metric_timestamp,
+        author_id as user_id,
+        -1 as metric_delta
+    from metric_issues
+    where closed_at is not null
+),
+
+issue_events_in_pr as (
+    select
+        a.repo_id,
+        'issues' as metric_type,
+        b.pr_id as metric_id,
+        b.created_at + interval '1 second' as metric_timestamp,
+        b.author_id as user_id,
+        -1 as metric_delta
+    from metric_issues as a
+    inner join metric_pull_requests as b
+    on a.repo_id = b.repo_id
+    and a.issue_number = b.pr_number
+    where b.closed_at is null
+),
+
+pr_events_open as (
+    select
+        repo_id,
+        'pull requests' as metric_type,
+        pr_id as metric_id,
+        created_at as metric_timestamp,
+        author_id as user_id,
+        1 as metric_delta
+    from metric_pull_requests
+    where created_at is not null
+),
+
+pr_events_closed as (
+    select
+        repo_id,
+        'pull requests' as metric_type,
+        pr_id as metric_id,
+        closed_at as metric_timestamp,
+        author_id as user_id,
+        -1 as metric_delta
+    from metric_pull_requests
+    where closed_at is not null
+),
+
+fork_events as (
+    select
+        repo_id,
+        'forks' as metric_type,
+        fork_id as metric_id,
+        created_at as metric_timestamp,
+        owner_id as user_id,
+        (owner_id is not null)::int as metric_delta
+    from metric_forks
+),
+
+commit_metrics_unnested as (
+    select
+        commit_id,
+        unnest(stats) as stats_unnested
+    from metric_commits
+),
+
+commit_metrics_summed as (
+    select
+        commit_metrics_unnested.commit_id,
+        sum(stats_unnested.additions) as additions_count, --noqa: RF01
+        sum(stats_unnested.deletions) as deletions_count --noqa: RF01
+    from commit_metrics_unnested
+    where
+        ends_with(stats_unnested.filename, '.py') --noqa: RF01
+        or ends_with(stats_unnested.filename, '.scala') --noqa: RF01
+        or ends_with(stats_unnested.filename, '.rs') --noqa: RF01
+    group by commit_metrics_unnested.commit_id
+),
+
+codebase_size_events as (
+    select
+        a.repo_id,
+        'lines of code' as metric_type,
+        a.commit_id as metric_id,
+        a.committed_at as metric_timestamp,
+        a.author_id as user_id,
+        sum(b.additions_count - b.deletions_count) as metric_delta
+    from metric_commits as a
+    inner join commit_metrics_summed as b
+    on a.commit_id = b.commit_id
+    group by all
+),
+
+commit_events as (
+    select
+        repo_id,
+        'commits' as metric_type,
+        commit_id as metric_id,
+        committed_at as metric_timestamp,
+        author_id as user_id,
+        1 as metric_delta
+    from metric_commits
+),
+
+events as (
+    select
+        repo_id,
+        metric_type,
+        metric_timestamp,
+        coalesce(metric_id, 'N/A') as metric_id,
+        user_id::bigint as user_id,
+        metric_delta::bigint as metric_delta
+    from
+        (
+            select *
+            from star_events
+            union all
+            select *
+            from issue_events_open
+            union all
+            select *
+            from issue_events_closed
+            union all
+            select *
+            from issue_events_in_pr
+            union all
+            select *
+            from pr_events_open
+            union all
+            select *
+            from pr_events_closed
+            union all
+            select *
+            from fork_events
+            union all
+            select *
+            from codebase_size_events
+            union all
+            select *
+            from commit_events
+        )
+)
+{%- endmacro %}
@@ -0,0 +1,39 @@
+{#-
+    melts each download dimension into (group_name, group_value) rows plus an
+    'overall' total using grouping sets, so the source is scanned once instead of
+    once per dimension
+-#}
+{% macro unpivot_downloads(source_relation) %}
+    {%- set group_cols = [
+        'country_code',
+        'package_version',
+        'python_version',
+        'system_distro_name',
+        'system_distro_version',
+        'system_name',
+        'system_release'
+    ] -%}
+    select
+        project as repo,
+        timestamp as download_timestamp,
+        case
+        {%- for col in group_cols %}
+            when grouping({{ col }}) = 0 then '{{ col }}'
+        {%- endfor %}
+            else 'overall'
+        end as group_name,
+        case
+        {%- for col in group_cols %}
+            when grouping({{ col }}) = 0 then {{ col }}
+        {%- endfor %}
+            else 'overall'
+        end as group_value,
+        sum(download_count)::uinteger as download_count
+    from {{ source_relation }}
+    group by grouping sets (
+        {%- for col in group_cols %}
+        (project, timestamp, {{ col }}),
+        {%- endfor %}
+        (project, timestamp)
+    )
+{% endmacro %}
@@ -0,0 +1,33 @@
+-- successful builds of each model compared to the median of its previous 10 builds
+with
+timings as (
+    select
+        model_name,
+        run_id,
+        invocation_id,
+        completed_at,
+        execution_time,
+        rows_affected,
+        bytes_scanned,
+        median(execution_time) over (
+            partition by unique_id
+            order by completed_at
+            rows between 10 preceding and 1 preceding
+        ) as trailing_median_execution_time
+    from {{ ref('stg_dbt_model_timings') }}
+    where status = 'success'
+)
+
+select
+    model_name,
+    run_id,
+    invocation_id,
+    completed_at,
+    execution_time,
+    rows_affected,
+    bytes_scanned,
+    trailing_median_execution_time,
+    round(
+        (execution_time / nullif(trailing_median_execution_time, 0) - 1) * 100, 1
+    ) as pct_change
+from timings
@@ -1,4 +1,43 @@
-with base as (
+{{
+    config(
+        materialized='incremental',
+        unique_key=[
+          'repo_name',
+          'user_name',
+          'event_id',
+          'event_type',
+          'event_action'
+        ],
+        post_hook=[
+            "{% if is_incremental() %}
+            delete from {{ this }} as a
+            where not exists (
+                select 1
+                from {{ ref('int_feed_events') }} as b
+                inner join {{ ref('stg_repos') }} as c
+                    on b.repo_id = c.repo_id
+                where
+                    c.repo_name = a.repo_name
+                    and b.event_id = a.event_id
+                    and b.event_type = a.event_type
+                    and b.event_action = a.event_action
+            )
+            {% endif %}"
+        ]
+    )
+}}
+
+-- incremental runs only pick up the events `int_feed_events` re-derived since this
+-- model last ran. the post_hook drops events it has since removed
+with
+{% if is_incremental() %}
+last_refresh as (
+    select coalesce(max(refreshed_at), '-infinity'::timestamptz) as refreshed_at
+    from {{ this }}
+),
+{% endif %}
+
+base as (
     select distinct
         b.repo_name,
         c.user_name,
@@ -7,12 +46,16 @@ with base as (
         a.event_type,
         a.event_action,
         a.event_data,
-        a.event_timestamp
+        a.event_timestamp,
+        a.refreshed_at
     from {{ ref("int_feed_events") }} as a
     inner join {{ ref("stg_repos") }} as b
         on a.repo_id = b.repo_id
     inner join  {{ ref("stg_users") }} as c
         on a.user_id = c.user_id
+    {% if is_incremental() %}
+    where a.refreshed_at > (select refreshed_at from last_refresh)
+    {% endif %}
 ),
 
 pr_numbers as (
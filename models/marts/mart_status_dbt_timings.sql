@@ -0,0 +1,36 @@
+-- latest build of each model with its runtime trend for the status page
+with
+weekly as (
+    select
+        model_name,
+        avg(execution_time) filter (
+            where completed_at >= now() - interval 7 day
+        ) as avg_execution_time_7d,
+        avg(execution_time) filter (
+            where completed_at < now() - interval 7 day
+            and completed_at >= now() - interval 14 day
+        ) as avg_execution_time_prev_7d
+    from {{ ref('mart_dbt_model_timings') }}
+    group by all
+),
+
+latest as (
+    select *
+    from {{ ref('mart_dbt_model_timings') }}
+    qualify row_number() over (
+        partition by model_name order by completed_at desc
+    ) = 1
+)
+
+select
+    a.model_name,
+    a.completed_at,
+    round(a.execution_time, 2) as execution_time,
+    round(a.trailing_median_execution_time, 2) as trailing_median_execution_time,
+    a.pct_change,
+    round(b.avg_execution_time_7d, 2) as avg_execution_time_7d,
+    round(
+        (b.avg_execution_time_7d / nullif(b.avg_execution_time_prev_7d, 0) - 1) * 100, 1
+    ) as pct_change_7d
+from latest as a
+left join weekly as b on a.model_name = b.model_name
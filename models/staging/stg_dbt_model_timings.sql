@@ -0,0 +1,13 @@
+{{ config(materialized='table') }}
+select
+    invocation_id,
+    unique_id,
+    run_id,
+    model_name,
+    status,
+    execution_time,
+    rows_affected,
+    bytes_scanned,
+    started_at,
+    completed_at
+from {{ source('main', 'dbt_model_timings') }}
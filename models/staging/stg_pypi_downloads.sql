@@ -11,23 +11,82 @@
           'system_distro_version', 
           'system_name', 
           'system_release'
-        ]
+        ],
+        post_hook="{{ record_delta_offset('data/bronze/pypi_download_facts') }}"
     )
 }}
 
+-- downloads are deduplicated on the compact dimension id before the client details
+-- are joined back in, so the window only has to compare integers
 with downloads_numbered as (
 select
     project,
     timestamp,
-    country_code,
-    package_version,
-    python_version,
-    system_distro_name,
-    system_distro_version,
-    system_name,
-    system_release,
+    dimension_id,
     download_count,
     retrieved_at,
+    row_number() over (
+        partition by 
+            project,
+            timestamp, 
+            dimension_id
+        order by retrieved_at desc
+        ) as rn
+    -- incremental runs only read files added since the last consumed delta version
+    from {{
+        delta_incremental_scan(
+            source('main', 'pypi_download_facts'),
+            'data/bronze/pypi_download_facts'
+        )
+    }}
+),
+new_downloads as (
+select
+    f.project,
+    f.timestamp,
+    d.country_code,
+    d.package_version,
+    d.python_version,
+    d.system_distro_name,
+    d.system_distro_version,
+    d.system_name,
+    d.system_release,
+    f.download_count::bigint as download_count,
+    f.retrieved_at
+    from downloads_numbered f
+    inner join {{ source('main', 'pypi_download_dimensions') }} d
+    on f.dimension_id = d.dimension_id
+    where f.rn = 1
+)
+{% if is_incremental() %}
+-- new rows can overlap hours already loaded by an earlier query. only the days of
+-- the new rows are rescanned to keep the row with the latest `retrieved_at` -
+-- every key a new row can replace falls in them
+, touched_windows as (
+    select distinct
+        project,
+        time_bucket(interval 1 day, timestamp) as min_timestamp,
+        time_bucket(interval 1 day, timestamp) + interval 1 day as max_timestamp
+    from new_downloads
+),
+candidates as (
+    select *, true as is_new
+    from new_downloads
+    union all
+    select a.*, false as is_new
+    from {{ this }} a
+    where exists (
+        select 1
+        from touched_windows b
+        where
+            a.project = b.project
+            and a.timestamp >= b.min_timestamp
+            and a.timestamp < b.max_timestamp
+    )
+),
+candidates_numbered as (
+select
+    *,
     row_number() over (
         partition by 
             project,
@@ -39,17 +98,24 @@ select
             system_distro_version, 
             system_name, 
             system_release
-        order by retrieved_at desc
-        ) as rn
-    from {{ source('main', 'pypi_downloads') }}
-    {% if is_incremental() %}
-        where
-            timestamp
-            > (select coalesce(max(timestamp), '1900-01-01') from {{ this }}) --noqa
-    {% endif %}
+        order by retrieved_at desc, is_new
+        ) as rn,
+    bool_or(is_new) over (
+        partition by 
+            project,
+            timestamp, 
+            country_code, 
+            package_version, 
+            python_version, 
+            system_distro_name, 
+            system_distro_version, 
+            system_name, 
+            system_release
+        ) as has_new
+    from candidates
 )
 select
-project,
+    project,
     timestamp,
     country_code,
     package_version,
@@ -58,7 +124,10 @@ project,
     system_distro_version,
     system_name,
     system_release,
-    download_count::bigint as download_count,
+    download_count,
     retrieved_at
-    from downloads_numbered
-    where rn = 1
+    from candidates_numbered
+    where rn = 1 and has_new
+{% else %}
+select * from new_downloads
+{% endif %}
@@ -6,28 +6,38 @@
           'download_timestamp',
           'group_name',
           'group_value'
-        ]
+        ],
+        post_hook="{{ record_delta_offset('data/bronze/pypi_download_queries') }}"
     )
 }}
 
 
-with downloads_melted as (
-    select 
-        repo,
-        download_timestamp,
-        group_name,
-        group_value,
-        download_count
-    from {{ ref('int_downloads_melted') }}
+with
+{% if is_incremental() %}
+touched_windows as (
+    {{ downloads_touched_windows('data/bronze/pypi_download_queries') }}
+),
+{% endif %}
+
+downloads_melted as (
+    select
+        a.repo,
+        a.download_timestamp,
+        a.group_name,
+        a.group_value,
+        a.download_count
+    from {{ ref('int_downloads_melted') }} as a
     {% if is_incremental() %}
-        where
-            download_timestamp
-            >= (
-                select coalesce(max(download_timestamp) + interval 1 day, date '1900-01-01') -- noqa
-                from {{ this }}
-            )
+        -- backfilled days and the latest, possibly partially loaded, day are rebuilt
+        where exists (
+            select 1
+            from touched_windows as b
+            where
+                (b.repo is null or a.repo = b.repo)
+                and a.download_timestamp >= b.min_timestamp
+                and a.download_timestamp < b.max_timestamp
+        )
     {% endif %}
-
 ),
 
 downloads_trunc as (
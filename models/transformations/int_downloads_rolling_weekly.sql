@@ -0,0 +1,79 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=[
+          'repo',
+          'download_timestamp',
+          'group_name',
+          'group_value'
+        ],
+        post_hook="{{ record_delta_offset('data/bronze/pypi_download_queries') }}"
+    )
+}}
+
+-- trailing 7 day sums for every day. only days whose window includes a touched
+-- day are recomputed, reading back just far enough to fill their windows
+with
+{% if is_incremental() %}
+    touched_windows as (
+        {{ downloads_touched_windows('data/bronze/pypi_download_queries') }}
+    ),
+    -- a changed day moves the sums of the 6 days after it
+    recompute_windows as (
+        select
+            repo,
+            min_timestamp,
+            max_timestamp + interval '6' day as max_timestamp
+        from touched_windows
+    ),
+{% endif %}
+    downloads_daily as (
+        select
+            a.repo,
+            a.download_timestamp,
+            a.group_name,
+            a.group_value,
+            a.download_count
+        from {{ ref("int_downloads_melted_daily") }} as a
+        {% if is_incremental() %}
+            where exists (
+                select 1
+                from recompute_windows as b
+                where
+                    (b.repo is null or a.repo = b.repo)
+                    and a.download_timestamp >= b.min_timestamp - interval '6' day
+                    and a.download_timestamp < b.max_timestamp
+            )
+        {% endif %}
+    ),
+    downloads_rolling as (
+        select
+            repo,
+            download_timestamp,
+            group_name,
+            group_value,
+            sum(download_count) over (
+                partition by repo, group_name, group_value
+                order by
+                    download_timestamp
+                    range between interval '6' day preceding and current row -- noqa: PRS
+            ) as download_count
+        from downloads_daily
+    )
+select
+    repo,
+    download_timestamp,
+    group_name,
+    group_value,
+    download_count::uinteger as download_count
+from downloads_rolling as a
+{% if is_incremental() %}
+    where exists (
+        select 1
+        from recompute_windows as b
+        where
+            (b.repo is null or a.repo = b.repo)
+            and a.download_timestamp >= b.min_timestamp
+            and a.download_timestamp < b.max_timestamp
+    )
+{% endif %}
@@ -1,128 +1,222 @@
-with star_events as (
+{{
+    config(
+        materialized='incremental',
+        unique_key=[
+          'event_type',
+          'event_action',
+          'repo_id',
+          'event_id'
+        ],
+        post_hook=[
+            "{% if is_incremental() %}
+            delete from {{ this }} as a
+            where
+                (a.event_type = 'star' and not exists (
+                    select 1 from {{ ref('stg_stargazers') }} as b
+                    where b.repo_id = a.repo_id and b.user_id::varchar = a.event_id
+                ))
+                or (a.event_type = 'fork' and not exists (
+                    select 1 from {{ ref('stg_forks') }} as b
+                    where b.repo_id = a.repo_id and b.fork_id::varchar = a.event_id
+                ))
+                or (a.event_type = 'issue' and not exists (
+                    select 1 from {{ ref('stg_issues') }} as b
+                    where
+                        b.repo_id = a.repo_id
+                        and b.issue_id::varchar = a.event_id
+                        and case a.event_action
+                            when 'created' then b.created_at is not null
+                            when 'updated' then b.updated_at is not null
+                            when 'closed' then b.closed_at is not null
+                        end
+                ))
+                or (a.event_type = 'pull request' and not exists (
+                    select 1 from {{ ref('stg_pull_requests') }} as b
+                    where
+                        b.repo_id = a.repo_id
+                        and b.pr_id::varchar = a.event_id
+                        and case a.event_action
+                            when 'created' then b.created_at is not null
+                            when 'updated' then b.updated_at is not null
+                            when 'closed' then b.closed_at is not null
+                            when 'merged' then b.merged_at is not null
+                        end
+                ))
+            {% endif %}"
+        ]
+    )
+}}
+
+-- events older than this behind the newest event of their repo, type and action
+-- are assumed settled and are not re-derived on incremental runs. the post_hook
+-- removes events whose source row is gone, like an unstar, a deleted fork or a
+-- reopened issue's close
+{% set lookback_days = 7 %}
+
+with
+{% if is_incremental() %}
+watermarks as (
+    select
+        repo_id,
+        event_type,
+        event_action,
+        max(event_timestamp) - interval {{ lookback_days }} day as min_event_timestamp
+    from {{ this }}
+    group by all
+),
+{% endif %}
+
+star_events as (
     select
         'star' as event_type,
         'created' as event_action,
-        starred_at as event_timestamp,
-        repo_id,
-        user_id,
-        user_id as event_id,
+        a.starred_at as event_timestamp,
+        a.repo_id,
+        a.user_id,
+        a.user_id as event_id,
         null as event_data
-    from {{ ref('stg_stargazers') }}
+    from {{ ref('stg_stargazers') }} as a
+    where {{ after_feed_watermark('star', 'created', 'a.starred_at') }}
 ),
 
 commit_events as (
     select
         'commit' as event_type,
         'created' as event_action,
-        committed_at as event_timestamp,
-        repo_id,
-        author_id as user_id,
-        commit_id as event_id,
-        message as event_data
-    from {{ ref('stg_commits') }}
+        a.committed_at as event_timestamp,
+        a.repo_id,
+        a.author_id as user_id,
+        a.commit_id as event_id,
+        a.message as event_data
+    from {{ ref('stg_commits') }} as a
+    where
+        {{ after_feed_watermark('commit', 'created', 'a.committed_at') }}
+        {% if is_incremental() %}
+        -- commits can arrive after newer ones with an older `committed_at`, so
+        -- the latest fetches are always re-derived
+        or a.retrieved_at >= (
+            select max(b.retrieved_at) - interval 24 hours
+            from {{ ref('stg_commits') }} as b
+        )
+        {% endif %}
 ),
 
 fork_events as (
     select
         'fork' as event_type,
         'created' as event_action,
-        created_at as event_timestamp,
-        repo_id,
-        owner_id as user_id,
-        fork_id as event_id,
+        a.created_at as event_timestamp,
+        a.repo_id,
+        a.owner_id as user_id,
+        a.fork_id as event_id,
         null as event_data
-    from {{ ref('stg_forks') }}
+    from {{ ref('stg_forks') }} as a
+    where {{ after_feed_watermark('fork', 'created', 'a.created_at') }}
 ),
 
 issue_created_events as (
     select
         'issue' as event_type,
         'created' as event_action,
-        created_at as event_timestamp,
-        repo_id,
-        author_id as user_id,
-        issue_id as event_id,
-        issue_title as event_data
-    from {{ ref('stg_issues') }}
-    where created_at is not null
+        a.created_at as event_timestamp,
+        a.repo_id,
+        a.author_id as user_id,
+        a.issue_id as event_id,
+        a.issue_title as event_data
+    from {{ ref('stg_issues') }} as a
+    where
+        a.created_at is not null
+        and {{ after_feed_watermark('issue', 'created', 'a.created_at') }}
 ),
 
 issue_updated_events as (
     select
         'issue' as event_type,
         'updated' as event_action,
-        updated_at as event_timestamp,
-        repo_id,
-        author_id as user_id,
-        issue_id as event_id,
-        issue_title as event_data
-    from {{ ref('stg_issues') }}
-    where updated_at is not null
+        a.updated_at as event_timestamp,
+        a.repo_id,
+        a.author_id as user_id,
+        a.issue_id as event_id,
+        a.issue_title as event_data
+    from {{ ref('stg_issues') }} as a
+    where
+        a.updated_at is not null
+        and {{ after_feed_watermark('issue', 'updated', 'a.updated_at') }}
 ),
 
 issue_closed_events as (
     select
         'issue' as event_type,
         'closed' as event_action,
-        closed_at as event_timestamp,
-        repo_id,
-        author_id as user_id,
-        issue_id as event_id,
-        issue_title as event_data
-    from {{ ref('stg_issues') }}
-    where closed_at is not null
+        a.closed_at as event_timestamp,
+        a.repo_id,
+        a.author_id as user_id,
+        a.issue_id as event_id,
+        a.issue_title as event_data
+    from {{ ref('stg_issues') }} as a
+    where
+        a.closed_at is not null
+        and {{ after_feed_watermark('issue', 'closed', 'a.closed_at') }}
 ),
 
 pr_created_events as (
     select
         'pull request' as event_type,
         'created' as event_action,
-        created_at as event_timestamp,
-        repo_id,
-        author_id as user_id,
-        pr_id as event_id,
-        pr_title as event_data
-    from {{ ref('stg_pull_requests') }}
-    where created_at is not null
+        a.created_at as event_timestamp,
+        a.repo_id,
+        a.author_id as user_id,
+        a.pr_id as event_id,
+        a.pr_title as event_data
+    from {{ ref('stg_pull_requests') }} as a
+    where
+        a.created_at is not null
+        and {{ after_feed_watermark('pull request', 'created', 'a.created_at') }}
 ),
 
 pr_updated_events as (
     select
         'pull request' as event_type,
         'updated' as event_action,
-        updated_at as event_timestamp,
-        repo_id,
-        author_id as user_id,
-        pr_id as event_id,
-        pr_title as event_data
-    from {{ ref('stg_pull_requests') }}
-    where updated_at is not null
+        a.updated_at as event_timestamp,
+        a.repo_id,
+        a.author_id as user_id,
+        a.pr_id as event_id,
+        a.pr_title as event_data
+    from {{ ref('stg_pull_requests') }} as a
+    where
+        a.updated_at is not null
+        and {{ after_feed_watermark('pull request', 'updated', 'a.updated_at') }}
 ),
 
 pr_closed_events as (
     select
         'pull request' as event_type,
         'closed' as event_action,
-        closed_at as event_timestamp,
-        repo_id,
-        author_id as user_id,
-        pr_id as event_id,
-        pr_title as event_data
-    from {{ ref('stg_pull_requests') }}
-    where closed_at is not null
+        a.closed_at as event_timestamp,
+        a.repo_id,
+        a.author_id as user_id,
+        a.pr_id as event_id,
+        a.pr_title as event_data
+    from {{ ref('stg_pull_requests') }} as a
+    where
+        a.closed_at is not null
+        and {{ after_feed_watermark('pull request', 'closed', 'a.closed_at') }}
 ),
 
 pr_merged_events as (
     select
         'pull request' as event_type,
         'merged' as event_action,
-        merged_at as event_timestamp,
-        repo_id,
-        author_id as user_id,
-        pr_id as event_id,
-        pr_title as event_data
-    from {{ ref('stg_pull_requests') }}
-    where merged_at is not null
+        a.merged_at as event_timestamp,
+        a.repo_id,
+        a.author_id as user_id,
+        a.pr_id as event_id,
+        a.pr_title as event_data
+    from {{ ref('stg_pull_requests') }} as a
+    where
+        a.merged_at is not null
+        and {{ after_feed_watermark('pull request', 'merged', 'a.merged_at') }}
 ),
 
 combined as (
@@ -154,5 +248,6 @@ select
     repo_id,
     user_id::bigint as user_id,
     event_id,
-    event_data
+    event_data,
+    now() as refreshed_at
 from combined
@@ -1,254 +1,219 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=[
+          'repo_id',
+          'metric_type',
+          'metric_timestamp',
+          'metric_id'
+        ],
+        post_hook=[
+            "{% if is_incremental() %}
+            delete from {{ this }}
+            where refreshed_at is null
+            {% endif %}"
+        ]
+    )
+}}
+
+-- each event contributes a signed delta to its repo's running count. incremental
+-- runs only read repos with staging rows retrieved in the 24 hours before the last
+-- run or since, or whose stored metrics lost their staging rows. their events are compared with the
+-- stored rows on every column but the count, so new, removed and changed events
+-- are all found, and each repo/metric is recounted from the stored row just
+-- before the earliest of them, seeded with the sum of the deltas before that row.
+-- removed events are emitted once with a null refreshed_at so the unique_key
+-- delete drops their stored row, and the post_hook then drops the marker
 with
-star_metrics as (
-    select
-        a.repo_id,
-        'stars' as metric_type,
-        null as metric_id,
-        a.starred_at as metric_timestamp,
-        a.user_id,
-        count(a.user_id) over (
-            partition by a.repo_id
-            order by a.starred_at
-            rows between unbounded preceding and current row
-        ) as metric_count
-    from {{ ref('stg_stargazers') }} as a
+{% if is_incremental() %}
+last_refresh as (
+    select max(refreshed_at) as refreshed_at
+    from {{ this }}
 ),
 
-issue_metrics_open as (
-    select
+staging_pairs as (
+    select distinct
         repo_id,
-        issue_id as metric_id,
-        created_at as metric_timestamp,
-        author_id as user_id,
-        1 as metric_count
-    from {{ ref('stg_issues') }}
-    where created_at is not null
-),
-
-issue_metrics_closed as (
-    select
+        'stars' as metric_type
+    from {{ ref('stg_stargazers') }}
+    union all
+    select distinct
         repo_id,
-        issue_id as metric_id,
-        closed_at as metric_timestamp,
-        author_id as user_id,
-        -1 as metric_count
+        unnest(['issues', 'pull requests']) as metric_type
+    from {{ ref('stg_pull_requests') }}
+    union all
+    select distinct
+        repo_id,
+        'issues' as metric_type
     from {{ ref('stg_issues') }}
-    where closed_at is not null
+    union all
+    select distinct
+        repo_id,
+        'forks' as metric_type
+    from {{ ref('stg_forks') }}
+    union all
+    select distinct
+        repo_id,
+        unnest(['commits', 'lines of code']) as metric_type
+    from {{ ref('stg_commits') }}
 ),
 
-issue_metrics_in_pr as (
-    select
-    a.repo_id,
-    b.pr_id as metric_id,
-    b.created_at + interval '1 second' as metric_timestamp,
-    b.author_id as user_id,
-    -1 as metric_count
-    from {{ ref('stg_issues') }} as a
-    inner join {{ ref('stg_pull_requests') }} as b
+changed_repos as (
+    {%- for source_model in [
+        'stg_stargazers',
+        'stg_issues',
+        'stg_pull_requests',
+        'stg_forks',
+        'stg_commits'
+    ] %}
+    select repo_id
+    from {{ ref(source_model) }}
+    where retrieved_at >= (select refreshed_at - interval 24 hours from last_refresh)
+    union
+    {%- endfor %}
+    select a.repo_id
+    from (select distinct repo_id, metric_type from {{ this }}) as a
+    anti join staging_pairs as b
     on a.repo_id = b.repo_id
-    and a.issue_number = b.pr_number
-    where b.closed_at is null
+    and a.metric_type = b.metric_type
 ),
 
-issue_metrics as (
-    select
-        repo_id,
-        'issues' as metric_type,
-        metric_id,
-        metric_timestamp,
-        user_id,
-        sum(metric_count) over (
-            partition by repo_id
-            order by metric_timestamp
-            rows between unbounded preceding and current row
-        ) as metric_count
-    from
-        (
-            select *
-            from issue_metrics_open
-            union all
-            select *
-            from issue_metrics_closed
-            union all
-            select *
-            from issue_metrics_in_pr
-        )
-),
+{{ repo_metric_events('changed_repos') }},
 
-pr_metrics_open as (
-    select
-        repo_id,
-        pr_id as metric_id,
-        created_at as metric_timestamp,
-        author_id as user_id,
-        1 as metric_count
-    from {{ ref('stg_pull_requests') }}
-    where created_at is not null
+stored_events as (
+    select *
+    from {{ this }}
+    where repo_id in (select repo_id from changed_repos)
 ),
 
-pr_metrics_closed as (
-    select
-        repo_id,
-        pr_id as metric_id,
-        closed_at as metric_timestamp,
-        author_id as user_id,
-        -1 as metric_count
-    from {{ ref('stg_pull_requests') }}
-    where closed_at is not null
+event_changes as (
+    select
+        coalesce(a.repo_id, b.repo_id) as repo_id,
+        coalesce(a.metric_type, b.metric_type) as metric_type,
+        coalesce(a.metric_timestamp, b.metric_timestamp) as metric_timestamp,
+        coalesce(a.metric_id, b.metric_id) as metric_id,
+        a.repo_id is null as is_removed
+    from events as a
+    full outer join stored_events as b
+    on a.repo_id = b.repo_id
+    and a.metric_type = b.metric_type
+    and a.metric_timestamp = b.metric_timestamp
+    and a.metric_id = b.metric_id
+    and a.user_id is not distinct from b.user_id
+    and a.metric_delta = b.metric_delta
+    where a.repo_id is null or b.repo_id is null
 ),
 
-pr_metrics as (
+removed_events as (
     select
-        repo_id,
-        'pull requests' as metric_type,
-        metric_id,
-        metric_timestamp,
-        user_id,
-        sum(metric_count) over (
-            partition by repo_id
-            order by metric_timestamp
-            rows between unbounded preceding and current row
-        ) as metric_count
-    from
-        (
-            select *
-            from pr_metrics_open
-            union all
-            select *
-            from pr_metrics_closed
-        )
+        a.repo_id,
+        a.metric_type,
+        a.metric_timestamp,
+        a.metric_id
+    from event_changes as a
+    anti join events as b
+    on a.repo_id = b.repo_id
+    and a.metric_type = b.metric_type
+    and a.metric_timestamp = b.metric_timestamp
+    and a.metric_id = b.metric_id
+    where a.is_removed
 ),
 
-fork_metrics as (
+changed_from as (
     select
         repo_id,
-        'forks' as metric_type,
-        fork_id as metric_id,
-        created_at as metric_timestamp,
-        owner_id as user_id,
-        count(user_id) over (
-            partition by repo_id
-            order by created_at
-            rows between unbounded preceding and current row
-        ) as metric_count
-    from {{ ref('stg_forks') }}
-),
-commit_metrics_unnested as (
-    select
-        commit_id,
-        unnest(stats) as stats_unnested
-    from {{ ref('stg_commits') }}
-),
-commit_metrics_summed as (
-    select
-        commit_metrics_unnested.commit_id,
-        sum(stats_unnested.additions) as additions_count, --noqa: RF01
-        sum(stats_unnested.deletions) as deletions_count --noqa: RF01
-    from commit_metrics_unnested
-    where
-        ends_with(stats_unnested.filename, '.py') --noqa: RF01
-        or ends_with(stats_unnested.filename, '.scala') --noqa: RF01
-        or ends_with(stats_unnested.filename, '.rs') --noqa: RF01
-    group by commit_metrics_unnested.commit_id
+        metric_type,
+        min(metric_timestamp) as changed_timestamp
+    from event_changes
+    group by all
 ),
-commit_metrics_added as (
+
+recompute_from as (
     select
         a.repo_id,
-        a.commit_id as metric_id,
-        a.committed_at as metric_timestamp,
-        a.author_id as user_id,
-        b.additions_count as metric_count
-    from {{ ref('stg_commits') }} as a
-    inner join commit_metrics_summed as b
-    on a.commit_id = b.commit_id
+        a.metric_type,
+        coalesce(max(b.metric_timestamp), a.changed_timestamp) as recompute_timestamp
+    from changed_from as a
+    left join stored_events as b
+    on a.repo_id = b.repo_id
+    and a.metric_type = b.metric_type
+    and b.metric_timestamp < a.changed_timestamp
+    group by a.repo_id, a.metric_type, a.changed_timestamp
 ),
 
-commit_metrics_deleted as (
+carried_counts as (
     select
         a.repo_id,
-        a.commit_id as metric_id,
-        a.committed_at as metric_timestamp,
-        a.author_id as user_id,
-        b.deletions_count * -1 as metric_count
-    from {{ ref('stg_commits') }} as a
-    inner join commit_metrics_summed as b
-    on a.commit_id = b.commit_id
+        a.metric_type,
+        sum(a.metric_delta) as metric_count
+    from stored_events as a
+    inner join recompute_from as b
+    on a.repo_id = b.repo_id
+    and a.metric_type = b.metric_type
+    and a.metric_timestamp < b.recompute_timestamp
+    group by all
 ),
 
-commit_metrics_combined as (
+events_to_count as (
     select
-        repo_id,
-        metric_id,
-        metric_timestamp,
-        user_id,
-        sum(metric_count) as metric_count
-    from
-        (
-            select *
-            from commit_metrics_added
-            union all
-            select *
-            from commit_metrics_deleted
-        )
-    group by all
+        a.*,
+        coalesce(c.metric_count, 0) as carried_count
+    from events as a
+    inner join recompute_from as b
+    on a.repo_id = b.repo_id
+    and a.metric_type = b.metric_type
+    and a.metric_timestamp >= b.recompute_timestamp
+    left join carried_counts as c
+    on a.repo_id = c.repo_id
+    and a.metric_type = c.metric_type
+),
+{% else %}
+{{ repo_metric_events() }},
 
+events_to_count as (
+    select
+        *,
+        0 as carried_count
+    from events
 ),
+{% endif %}
 
-codebase_size_metrics as (
+counted as (
     select
         repo_id,
-        'lines of code' as metric_type,
-        metric_id,
+        metric_type,
         metric_timestamp,
+        metric_id,
         user_id,
-        sum(metric_count) over (
-            partition by repo_id
-            order by metric_timestamp
+        metric_delta,
+        carried_count + sum(metric_delta) over (
+            partition by repo_id, metric_type
+            order by metric_timestamp, metric_id, user_id nulls first, metric_delta
             rows between unbounded preceding and current row
         ) as metric_count
-    from commit_metrics_combined
-),
-
-commit_metrics as (
-    select
-        repo_id,
-        'commits' as metric_type,
-        commit_id as metric_id,
-        committed_at as metric_timestamp,
-        author_id as user_id,
-        count(commit_id) over (
-            partition by repo_id
-            order by metric_timestamp
-            rows between unbounded preceding and current row
-        ) as metric_count
-    from  {{ ref('stg_commits') }}
-),
-
-combined as (
-    select *
-    from star_metrics
-    union all
-    select *
-    from issue_metrics
-    union all
-    select *
-    from fork_metrics
-    union all
-    select *
-    from codebase_size_metrics
-    union all
-    select *
-    from commit_metrics
-    union all
-    select *
-    from pr_metrics
+    from events_to_count
 )
 
 select -- noqa
     repo_id,
     metric_type,
     metric_timestamp,
-    coalesce(metric_id, 'N/A') as metric_id,
+    metric_id,
     user_id::bigint as user_id,
-    metric_count::bigint as metric_count
-from combined
+    metric_count::bigint as metric_count,
+    now() as refreshed_at,
+    metric_delta::bigint as metric_delta
+from counted
+{% if is_incremental() %}
+union all
+select
+    repo_id,
+    metric_type,
+    metric_timestamp,
+    metric_id,
+    null::bigint as user_id,
+    null::bigint as metric_count,
+    null::timestamptz as refreshed_at,
+    null::bigint as metric_delta
+from removed_events
+{% endif %}
@@ -1,3 +1,25 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['repo_id', 'metric_type', 'metric_date'],
+        pre_hook=[
+            "{% if is_incremental() %}
+            delete from {{ this }}
+            where metric_date <> time_bucket(interval 7 day, metric_date)
+            or metric_date > (select max(metric_timestamp) from {{ ref('int_repo_metrics') }})::date
+            or repo_id not in (select distinct repo_id from {{ ref('int_repo_metrics') }})
+            {% endif %}"
+        ]
+    )
+}}
+
+-- incremental runs rebuild each repo/metric from the start of the earliest week
+-- it could have changed in: the week of its first recounted metric, the week that
+-- held the previous last spine date, or the whole spine for new pairs, pairs whose
+-- first counted week moved and every pair once the spine starts earlier. values
+-- from before that week are carried in as a single seed row so the fill below
+-- never has to look further back. the pre_hook drops the previous run's current
+-- date row and repos that no longer have metrics
 with
     metric_list as (
         select distinct metric_type
@@ -11,30 +33,206 @@ with
         where repo_id is not null
     ),
 
+    spine_bounds as (
+        select min(spine_date) as min_date
+        from {{ ref("helper_date_spine") }}
+    ),
+
+    {% if is_incremental() %}
+    last_refresh as (
+        select max(refreshed_at) as refreshed_at
+        from {{ this }}
+    ),
+
+    previous_max_date as (
+        select time_bucket('1 day', max(metric_timestamp))::date as metric_date
+        from {{ ref("int_repo_metrics") }}
+        where refreshed_at <= (select refreshed_at from last_refresh)
+    ),
+
+    changed_from as (
+        select
+            repo_id,
+            metric_type,
+            min(time_bucket('1 day', metric_timestamp))::date as metric_date
+        from {{ ref("int_repo_metrics") }}
+        where refreshed_at > (select refreshed_at from last_refresh)
+        group by all
+    ),
+
+    existing_pairs as (
+        select
+            repo_id,
+            metric_type,
+            min(case when metric_count is not null then metric_date end) as first_week,
+            min(metric_date) as min_date
+        from {{ this }}
+        group by all
+    ),
+
+    first_weeks as (
+        select
+            repo_id,
+            metric_type,
+            time_bucket(
+                interval 7 day, min(time_bucket('1 day', metric_timestamp))::date
+            ) as first_week
+        from {{ ref("int_repo_metrics") }}
+        group by all
+    ),
+
+    recompute_from as (
+        select
+            b.repo_id,
+            a.metric_type,
+            greatest(
+                time_bucket(
+                    interval 7 day,
+                    least(
+                        coalesce(
+                            (select metric_date from previous_max_date),
+                            (select min_date from spine_bounds)
+                        ),
+                        c.metric_date,
+                        case
+                            when
+                                d.repo_id is null
+                                or d.first_week is distinct from e.first_week
+                                or d.min_date > time_bucket(
+                                    interval 7 day, (select min_date from spine_bounds)
+                                )
+                                then (select min_date from spine_bounds)
+                        end
+                    )
+                ),
+                (select min_date from spine_bounds)
+            ) as metric_date
+        from metric_list as a
+        cross join repo_list as b
+        left join changed_from as c
+            on a.metric_type = c.metric_type
+            and b.repo_id = c.repo_id
+        left join existing_pairs as d
+            on a.metric_type = d.metric_type
+            and b.repo_id = d.repo_id
+        left join first_weeks as e
+            on a.metric_type = e.metric_type
+            and b.repo_id = e.repo_id
+    ),
+    {% else %}
+    recompute_from as (
+        select
+            b.repo_id,
+            a.metric_type,
+            (select min_date from spine_bounds) as metric_date
+        from metric_list as a
+        cross join repo_list as b
+    ),
+    {% endif %}
+
     date_spine_full as (
-        select distinct a.spine_date as metric_date, c.repo_id, b.metric_type
+        select distinct a.spine_date as metric_date, b.repo_id, b.metric_type
         from {{ ref("helper_date_spine") }} as a
-        cross join metric_list as b
-        cross join repo_list as c
+        inner join recompute_from as b
+            on a.spine_date >= b.metric_date
     ),
 
     metric_dates_rn as (
         select
-            repo_id,
-            metric_type,
-            time_bucket('1 day', metric_timestamp) as metric_date,
-            metric_id,
-            user_id,
-            metric_count,
+            a.repo_id,
+            a.metric_type,
+            time_bucket('1 day', a.metric_timestamp) as metric_date,
+            a.metric_id,
+            a.user_id,
+            a.metric_count,
             row_number() over (
-                partition by repo_id, metric_type, metric_date
-                order by metric_timestamp desc
+                partition by a.repo_id, a.metric_type, time_bucket('1 day', a.metric_timestamp)
+                order by
+                    a.metric_timestamp desc,
+                    a.metric_id desc,
+                    a.user_id desc,
+                    a.metric_delta desc
             ) as rn
-        from {{ ref("int_repo_metrics") }}
+        from {{ ref("int_repo_metrics") }} as a
+        inner join recompute_from as b
+            on a.repo_id = b.repo_id
+            and a.metric_type = b.metric_type
+            and time_bucket('1 day', a.metric_timestamp) >= b.metric_date
     ),
 
     metric_dates as (select * from metric_dates_rn where rn = 1),
 
+    {% if is_incremental() %}
+    carried_counts as (
+        select
+            a.repo_id,
+            a.metric_type,
+            a.metric_id,
+            a.metric_count
+        from {{ ref("int_repo_metrics") }} as a
+        inner join recompute_from as b
+            on a.repo_id = b.repo_id
+            and a.metric_type = b.metric_type
+            and time_bucket('1 day', a.metric_timestamp) < b.metric_date
+        qualify row_number() over (
+            partition by a.repo_id, a.metric_type
+            order by
+                a.metric_timestamp desc,
+                a.metric_id desc,
+                a.user_id desc,
+                a.metric_delta desc
+        ) = 1
+    ),
+
+    carried_users as (
+        select
+            repo_id,
+            metric_type,
+            arg_max(user_id, metric_timestamp) as user_id
+        from
+            (
+                select
+                    a.repo_id,
+                    a.metric_type,
+                    a.metric_timestamp,
+                    a.user_id
+                from {{ ref("int_repo_metrics") }} as a
+                inner join recompute_from as b
+                    on a.repo_id = b.repo_id
+                    and a.metric_type = b.metric_type
+                    and time_bucket('1 day', a.metric_timestamp) < b.metric_date
+                qualify row_number() over (
+                    partition by a.repo_id, a.metric_type, time_bucket('1 day', a.metric_timestamp)
+                    order by
+                        a.metric_timestamp desc,
+                        a.metric_id desc,
+                        a.user_id desc,
+                        a.metric_delta desc
+                ) = 1
+            )
+        where user_id is not null
+        group by all
+    ),
+
+    carried_metrics as (
+        select
+            a.metric_date - interval 1 day as metric_date,
+            a.repo_id,
+            a.metric_type,
+            b.metric_id,
+            c.user_id,
+            b.metric_count
+        from recompute_from as a
+        left join carried_counts as b
+            on a.repo_id = b.repo_id
+            and a.metric_type = b.metric_type
+        left join carried_users as c
+            on a.repo_id = c.repo_id
+            and a.metric_type = c.metric_type
+        where b.repo_id is not null or c.repo_id is not null
+    ),
+    {% endif %}
+
     metric_dates_complete as (
         select
             a.metric_date,
@@ -49,6 +247,11 @@ with
             on a.metric_date = b.metric_date
             and a.metric_type = b.metric_type
             and a.repo_id = b.repo_id
+        {% if is_incremental() %}
+        union all
+        select *
+        from carried_metrics
+        {% endif %}
     ),
 
     metrics_fill_prep as (
@@ -96,13 +299,17 @@ with
 
     metrics_trunc as (
         select
-            repo_id,
-            metric_type,
-            time_bucket('7 day', metric_date) as metric_date,
-            max(metric_id) as metric_id,
-            max(user_id) as user_id,
-            max(metric_count) as metric_count
-        from metrics_filled_down
+            a.repo_id,
+            a.metric_type,
+            time_bucket('7 day', a.metric_date) as metric_date,
+            max(a.metric_id) as metric_id,
+            max(a.user_id) as user_id,
+            max(a.metric_count) as metric_count
+        from metrics_filled_down as a
+        inner join recompute_from as b
+            on a.repo_id = b.repo_id
+            and a.metric_type = b.metric_type
+            and a.metric_date >= b.metric_date
         group by all
     ),
 
@@ -147,6 +354,7 @@ select  -- noqa
     metric_date::date as metric_date,
     coalesce(metric_id, 'N/A') as metric_id,
     user_id::bigint as user_id,
-    metric_count::bigint as metric_count
+    metric_count::bigint as metric_count,
+    now() as refreshed_at
 from metrics_final_dedupe
 where rn = 1
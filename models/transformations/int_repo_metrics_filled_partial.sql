@@ -1,6 +1,12 @@
 with
 max_filled_vals as (
-    select *
+    select
+        repo_id,
+        metric_type,
+        metric_date,
+        metric_id,
+        user_id,
+        metric_count
     from {{ ref("int_repo_metrics_filled") }}
     where
         metric_date
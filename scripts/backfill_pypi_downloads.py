@@ -16,8 +16,17 @@ def backfill(
     max_date: Optional[str] = None,
     repo_dependency: Optional[str] = None,
     max_days_per_chunk: int = 15,
+    max_workers: int = 4,
+    target_gib_per_query: Optional[float] = None,
+    daily_budget_gib: float = 500,
     dry_run: bool = True,
+    estimate_bytes: bool = False,
 ) -> None:
+    """
+    dry runs print the planned chunks without credentials. pass `--estimate-bytes`
+    to price them with bigquery dry runs against the daily budget and to size
+    chunks from `--target-gib-per-query`
+    """
     if min_date is None and repo_dependency is None:
         raise ValueError(
             "expecting either `min_date` or `repo_dependency` to be provided"
@@ -40,12 +49,20 @@ def backfill(
     else:
         max_date_dt = None
 
+    target_bytes_per_query = None
+    if target_gib_per_query is not None:
+        target_bytes_per_query = int(target_gib_per_query * 1024**3)
+
     add_backfill_to_table(
         repo,
         min_date_dt,
         max_date_dt,
         max_days_per_chunk,
         dry_run,
+        max_workers,
+        target_bytes_per_query,
+        int(daily_budget_gib * 1024**3),
+        estimate_bytes,
     )
 
 
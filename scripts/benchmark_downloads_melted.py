@@ -0,0 +1,136 @@
+import time
+
+import duckdb
+import typer
+
+app = typer.Typer()
+
+GROUP_COLS = [
+    "country_code",
+    "package_version",
+    "python_version",
+    "system_distro_name",
+    "system_distro_version",
+    "system_name",
+    "system_release",
+]
+
+# original int_downloads_melted: one scan per dimension, overall re-aggregated
+UNION_ALL_SQL = f"""
+with
+melted as (
+    {" union all ".join(
+        f"select project, timestamp, '{col}' as group_name, {col} as group_value, "
+        "download_count from downloads"
+        for col in GROUP_COLS
+    )}
+),
+summed as (
+    select
+        project as repo,
+        timestamp as download_timestamp,
+        group_name,
+        group_value,
+        sum(download_count)::uinteger as download_count
+    from melted
+    group by all
+)
+select * from summed
+union all
+select
+    repo,
+    download_timestamp,
+    'overall' as group_name,
+    'overall' as group_value,
+    sum(download_count)::uinteger as download_count
+from summed
+where group_name = 'system_name'
+group by all
+"""
+
+# rendered output of macros/unpivot_downloads.sql
+UNPIVOT_SQL = f"""
+select
+    project as repo,
+    timestamp as download_timestamp,
+    case
+        {" ".join(f"when grouping({col}) = 0 then '{col}'" for col in GROUP_COLS)}
+        else 'overall'
+    end as group_name,
+    case
+        {" ".join(f"when grouping({col}) = 0 then {col}" for col in GROUP_COLS)}
+        else 'overall'
+    end as group_value,
+    sum(download_count)::uinteger as download_count
+from downloads
+group by grouping sets (
+    {", ".join(f"(project, timestamp, {col})" for col in GROUP_COLS)},
+    (project, timestamp)
+)
+"""
+
+
+def create_synthetic_downloads(
+    con: duckdb.DuckDBPyConnection, n_projects: int, rows_per_hour: int
+) -> int:
+    """a year of hourly downloads with skewed, low-cardinality client details"""
+    dimension_sql = ",\n".join(
+        f"'{col}_' || (floor(pow(random(), 3) * {cardinality}))::int as {col}"
+        for col, cardinality in zip(GROUP_COLS, [200, 120, 150, 30, 200, 6, 2000])
+    )
+    con.sql("select setseed(0.42)")
+    con.sql(
+        f"""
+        create or replace table downloads as
+        select
+            'project_' || p.i as project,
+            h.ts as timestamp,
+            {dimension_sql},
+            (random() * 50)::int + 1 as download_count
+        from range({n_projects}) as p(i)
+        cross join generate_series(
+            timestamp '2024-01-01', timestamp '2024-12-31 23:00:00', interval 1 hour
+        ) as h(ts)
+        cross join range({rows_per_hour}) as r(i)
+        """
+    )
+    return con.sql("select count(*) from downloads").fetchall()[0][0]
+
+
+def time_query(con: duckdb.DuckDBPyConnection, sql: str, n_runs: int) -> float:
+    timings = []
+    for _ in range(n_runs):
+        start_time = time.time()
+        con.sql(f"create or replace temp table result as {sql}")
+        timings.append(time.time() - start_time)
+    return min(timings)
+
+
+@app.command()
+def benchmark(n_projects: int = 5, rows_per_hour: int = 20, n_runs: int = 3) -> None:
+    con = duckdb.connect()
+    con.sql("set enable_progress_bar = false")
+    n_records = create_synthetic_downloads(con, n_projects, rows_per_hour)
+    print(f"generated {n_records} hourly download records")
+
+    n_mismatched = con.sql(
+        f"""
+        select count(*) from (
+            (({UNION_ALL_SQL}) except ({UNPIVOT_SQL}))
+            union all
+            (({UNPIVOT_SQL}) except ({UNION_ALL_SQL}))
+        )
+        """
+    ).fetchall()[0][0]
+    if n_mismatched > 0:
+        raise ValueError(f"{n_mismatched} records differ between melt strategies")
+
+    union_all_seconds = time_query(con, UNION_ALL_SQL, n_runs)
+    unpivot_seconds = time_query(con, UNPIVOT_SQL, n_runs)
+    print(f"union all: {union_all_seconds:.2f}s")
+    print(f"unpivot:   {unpivot_seconds:.2f}s")
+    print(f"speedup:   {union_all_seconds / unpivot_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    app()
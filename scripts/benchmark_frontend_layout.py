@@ -0,0 +1,179 @@
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+import typer
+
+app = typer.Typer()
+
+N_REPOS = 30
+GROUPS = ["overall", "package_version", "python_version", "system_name"]
+EVENT_TYPES = ["star", "fork", "issue", "pull request", "commit"]
+
+# mirrors the queries behind `/downloads/*` (`get_downloads_base`) and `/feed/list`
+DOWNLOADS_QUERY = """
+    select *
+    from {table}
+    where repo = ?
+    and group_name = ?
+    and download_timestamp >= now() - interval {n_days} days
+    order by download_timestamp desc, download_count desc
+    limit {limit}
+"""
+
+FEED_QUERY = """
+    select * from mart_feed_events
+    where 1 = 1
+    and event_timestamp >= now() - interval 60 days
+    and repo_name = ?
+    order by event_timestamp desc
+    limit 50
+"""
+
+LAYOUTS = {
+    "int_downloads_melted": "repo, group_name, download_timestamp",
+    "int_downloads_melted_daily": "repo, group_name, download_timestamp",
+    "mart_feed_events": "repo_name, event_timestamp",
+}
+
+
+def create_synthetic_frontend(
+    db_path: Path, n_download_records: int, n_feed_records: int, clustered: bool
+) -> None:
+    """
+    hourly downloads and feed events ending now. unclustered tables are shuffled to
+    stand in for the order an unsorted copy leaves behind
+    """
+    con = duckdb.connect(str(db_path))
+    con.sql("set enable_progress_bar = false")
+    con.sql(
+        f"""
+        create table downloads_base as
+        select
+            'repo_' || (i % {N_REPOS}) as repo,
+            date_trunc('hour', now()) - interval (i // {N_REPOS * len(GROUPS) * 8}) hour
+                as download_timestamp,
+            {GROUPS}[(i // {N_REPOS}) % {len(GROUPS)} + 1] as group_name,
+            'value_' || (i % 8) as group_value,
+            (hash(i) % 1000)::uinteger as download_count
+        from range({n_download_records}) as t(i)
+        """
+    )
+    con.sql(
+        """
+        create table daily_base as
+        select
+            repo,
+            time_bucket('1 day', download_timestamp) as download_timestamp,
+            group_name,
+            group_value,
+            sum(download_count) as download_count
+        from downloads_base
+        group by all
+        """
+    )
+    con.sql(
+        f"""
+        create table feed_base as
+        select
+            'repo_' || (hash(i) % {N_REPOS}) as repo_name,
+            'user_' || (i % 5000) as user_name,
+            i::varchar as event_id,
+            {EVENT_TYPES}[i % {len(EVENT_TYPES)} + 1] as event_type,
+            'created' as event_action,
+            'event ' || i as event_data,
+            now() - interval (i) minute as event_timestamp
+        from range({n_feed_records}) as t(i)
+        """
+    )
+
+    sources = {
+        "int_downloads_melted": "downloads_base",
+        "int_downloads_melted_daily": "daily_base",
+        "mart_feed_events": "feed_base",
+    }
+    for table, source in sources.items():
+        order_by = LAYOUTS[table] if clustered else "hash(rowid)"
+        con.sql(f"create table {table} as select * from {source} order by {order_by}")
+        con.sql(f"drop table {source}")
+
+    con.sql("checkpoint")
+    con.close()
+
+
+def time_queries(
+    con: duckdb.DuckDBPyConnection, query: str, params: list[list[str]]
+) -> list[float]:
+    latencies = []
+    for param in params:
+        start_time = time.perf_counter()
+        con.execute(query, param).fetchall()
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return latencies
+
+
+def summarize(latencies: list[float]) -> str:
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    return f"p50 {statistics.median(latencies):6.2f}ms  p95 {p95:6.2f}ms"
+
+
+@app.command()
+def benchmark(
+    n_download_records: int = 20_000_000,
+    n_feed_records: int = 500_000,
+    n_queries: int = 200,
+) -> None:
+    """
+    latency of the `/downloads/*` and `/feed/list` queries against a frontend db
+    written in copy order versus clustered on the columns those routes filter by
+    """
+    rng = random.Random(42)
+    downloads_params = [
+        [f"repo_{rng.randrange(N_REPOS)}", rng.choice(GROUPS)] for _ in range(n_queries)
+    ]
+    feed_params = [[f"repo_{rng.randrange(N_REPOS)}"] for _ in range(n_queries)]
+    routes = {
+        "/downloads/hourly": (
+            DOWNLOADS_QUERY.format(table="int_downloads_melted", n_days=7, limit=168),
+            downloads_params,
+        ),
+        "/downloads/daily": (
+            DOWNLOADS_QUERY.format(
+                table="int_downloads_melted_daily", n_days=30, limit=100
+            ),
+            downloads_params,
+        ),
+        "/feed/list": (FEED_QUERY, feed_params),
+    }
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for layout in ["unclustered", "clustered"]:
+            db_path = Path(tmp_dir) / f"frontend_{layout}.duckdb"
+            create_synthetic_frontend(
+                db_path, n_download_records, n_feed_records, layout == "clustered"
+            )
+
+            con = duckdb.connect(str(db_path), read_only=True)
+            for route, (query, params) in routes.items():
+                time_queries(con, query, params[:5])
+                results[(route, layout)] = time_queries(con, query, params)
+            con.close()
+
+    print(f"{n_download_records:,} hourly download records, {n_queries} queries each")
+    for route in routes:
+        before = results[(route, "unclustered")]
+        after = results[(route, "clustered")]
+        print(f"{route}")
+        print(f"  unclustered: {summarize(before)}")
+        print(f"  clustered:   {summarize(after)}")
+        print(
+            f"  speedup:     {statistics.median(before) / statistics.median(after):.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,142 @@
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+import typer
+
+app = typer.Typer()
+
+
+def copy_table_via_pandas(
+    backend_con: duckdb.DuckDBPyConnection,
+    frontend_con: duckdb.DuckDBPyConnection,
+    table: str,
+    batch_size: int = 200_000,
+) -> None:
+    """original mirror: pandas batches paged with limit/offset"""
+    offset = 0
+    first_batch = True
+    while True:
+        df = backend_con.sql(
+            f"SELECT * FROM {table} LIMIT {batch_size} OFFSET {offset}"
+        ).to_df()
+
+        if df.empty:
+            break
+
+        if first_batch:
+            duckdb.sql(
+                f"CREATE TABLE {table} AS SELECT * FROM df", connection=frontend_con
+            )
+            first_batch = False
+        else:
+            duckdb.sql(f"INSERT INTO {table} SELECT * FROM df", connection=frontend_con)
+        offset += batch_size
+
+
+def copy_table_via_attach(
+    backend_path: Path, frontend_con: duckdb.DuckDBPyConnection, table: str
+) -> None:
+    """current mirror: attach the backend read-only and copy inside duckdb"""
+    frontend_con.sql(f"attach '{backend_path}' as backend (read_only)")
+    frontend_con.sql(
+        f"create or replace table {table} as select * from backend.main.{table}"
+    )
+    frontend_con.sql("detach backend")
+
+
+def create_synthetic_backend(backend_path: Path, table: str, n_records: int) -> None:
+    """hourly melted downloads shaped like `int_downloads_melted`"""
+    con = duckdb.connect(str(backend_path))
+    con.sql("set enable_progress_bar = false")
+    con.sql("select setseed(0.42)")
+    con.sql(
+        f"""
+        create table {table} as
+        select
+            'project_' || (i % 20) as repo,
+            timestamptz '2024-01-01' + interval (i // 400) hour as download_timestamp,
+            'group_' || (i % 8) as group_name,
+            'value_' || (floor(pow(random(), 3) * 500))::int as group_value,
+            (random() * 1000)::uinteger as download_count
+        from range({n_records}) as t(i)
+        """
+    )
+    con.close()
+
+
+def time_copy(frontend_path: Path, copy_func) -> float:
+    frontend_path.unlink(missing_ok=True)
+    frontend_con = duckdb.connect(str(frontend_path))
+    frontend_con.sql("set enable_progress_bar = false")
+    start_time = time.time()
+    copy_func(frontend_con)
+    elapsed = time.time() - start_time
+    frontend_con.close()
+    return elapsed
+
+
+@app.command()
+def benchmark(
+    backend_path: Optional[Path] = None,
+    table: str = "int_downloads_melted",
+    synthetic_records: int = 5_000_000,
+    n_runs: int = 3,
+) -> None:
+    """
+    times the pandas and attach mirror paths on one table. uses `backend_path` when
+    given, otherwise a synthetic backend with `synthetic_records` rows
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        if backend_path is None:
+            backend_path = tmp_path / "backend.duckdb"
+            create_synthetic_backend(backend_path, table, synthetic_records)
+
+        backend_con = duckdb.connect(str(backend_path), read_only=True)
+        backend_con.sql("set enable_progress_bar = false")
+        n_records = backend_con.sql(f"select count(*) from {table}").fetchall()[0][0]
+        print(f"benchmarking {table} - {n_records:,} records")
+
+        pandas_path = tmp_path / "frontend_pandas.duckdb"
+        attach_path = tmp_path / "frontend_attach.duckdb"
+        pandas_seconds = min(
+            time_copy(
+                pandas_path, lambda con: copy_table_via_pandas(backend_con, con, table)
+            )
+            for _ in range(n_runs)
+        )
+        backend_con.close()
+
+        attach_seconds = min(
+            time_copy(
+                attach_path, lambda con: copy_table_via_attach(backend_path, con, table)
+            )
+            for _ in range(n_runs)
+        )
+
+        con = duckdb.connect()
+        con.sql(f"attach '{pandas_path}' as pandas_copy (read_only)")
+        con.sql(f"attach '{attach_path}' as attach_copy (read_only)")
+        n_mismatched = con.sql(
+            f"""
+            select count(*) from (
+                (from pandas_copy.main.{table} except all from attach_copy.main.{table})
+                union all
+                (from attach_copy.main.{table} except all from pandas_copy.main.{table})
+            )
+            """
+        ).fetchall()[0][0]
+        con.close()
+        if n_mismatched > 0:
+            raise ValueError(f"{n_mismatched} records differ between mirror strategies")
+
+    print(f"pandas: {pandas_seconds:.2f}s")
+    print(f"attach: {attach_seconds:.2f}s")
+    print(f"speedup: {pandas_seconds / attach_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,120 @@
+import time
+
+import networkx as nx
+import numpy as np
+import typer
+
+from ampere.network_layout import grid_spring_layout, incremental_spring_layout
+
+app = typer.Typer()
+
+
+def create_synthetic_star_network(n_nodes: int, n_repos: int = 30) -> nx.Graph:
+    """
+    shaped like `create_stargazer_network`: one node per (user, repo) star tied to its
+    repo, and each user's stars tied to one another
+    """
+    rng = np.random.default_rng(42)
+    graph = nx.Graph()
+    graph.add_nodes_from(f"repo_{i}" for i in range(n_repos))
+
+    user = 0
+    n_added = n_repos
+    while n_added < n_nodes:
+        n_stars = min(int(rng.integers(1, 4)), n_nodes - n_added)
+        repos = rng.choice(n_repos, size=n_stars, replace=False)
+        stars = [f"user_{user}_repo_{i}" for i in repos]
+        for star, repo in zip(stars, repos):
+            graph.add_edge(star, f"repo_{repo}", weight=50)
+        for i, star in enumerate(stars):
+            for other in stars[:i]:
+                graph.add_edge(star, other, weight=0.1)
+        n_added += n_stars
+        user += 1
+
+    return graph
+
+
+def get_edge_stretch(graph: nx.Graph, pos: dict) -> float:
+    """mean edge length over the mean distance between random node pairs"""
+    rng = np.random.default_rng(0)
+    coords = np.array([pos[i] for i in graph.nodes])
+    edges = np.array([(pos[u], pos[v]) for u, v in graph.edges])
+    edge_length = np.linalg.norm(edges[:, 0] - edges[:, 1], axis=-1).mean()
+    pairs = rng.integers(0, len(coords), size=(10_000, 2))
+    pair_length = np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=-1)
+    return float(edge_length / pair_length.mean())
+
+
+@app.command()
+def benchmark(
+    sizes: str = "1000,10000,100000",
+    max_networkx_nodes: int = 10_000,
+    iterations: int = 50,
+) -> None:
+    """
+    times `nx.spring_layout` against `grid_spring_layout` on synthetic star networks.
+    networkx is skipped above `max_networkx_nodes` since it is quadratic per iteration
+    """
+    for n_nodes in [int(i) for i in sizes.split(",")]:
+        graph = create_synthetic_star_network(n_nodes)
+        print(f"{graph.number_of_nodes():,} nodes, {graph.number_of_edges():,} edges")
+
+        start_time = time.time()
+        pos = grid_spring_layout(graph, iterations=iterations)
+        grid_seconds = time.time() - start_time
+        print(
+            f"  grid:     {grid_seconds:8.2f}s  "
+            f"edge stretch {get_edge_stretch(graph, pos):.3f}"
+        )
+
+        if n_nodes > max_networkx_nodes:
+            print("  networkx: skipped")
+            continue
+
+        start_time = time.time()
+        pos = nx.spring_layout(graph, iterations=iterations, seed=42)
+        networkx_seconds = time.time() - start_time
+        print(
+            f"  networkx: {networkx_seconds:8.2f}s  "
+            f"edge stretch {get_edge_stretch(graph, pos):.3f}  "
+            f"speedup {networkx_seconds / grid_seconds:.1f}x"
+        )
+
+
+@app.command()
+def benchmark_incremental(
+    n_nodes: int = 20_000, n_new_nodes: int = 2_000, iterations: int = 50
+) -> None:
+    """
+    times `incremental_spring_layout` against a full `grid_spring_layout` after
+    `n_new_nodes` leaves join a preferential attachment graph of `n_nodes`
+    """
+    rng = np.random.default_rng(42)
+    previous_graph = nx.barabasi_albert_graph(n_nodes, 1, seed=42)
+    nx.set_node_attributes(
+        previous_graph, grid_spring_layout(previous_graph, iterations=iterations), "pos"
+    )
+    graph = nx.Graph(previous_graph.edges)
+    for i in range(n_new_nodes):
+        graph.add_edge(n_nodes + i, int(rng.integers(0, n_nodes)))
+
+    start_time = time.time()
+    pos = incremental_spring_layout(graph, previous_graph, iterations=iterations)
+    incremental_seconds = time.time() - start_time
+    print(
+        f"  incremental: {incremental_seconds:8.2f}s  "
+        f"edge stretch {get_edge_stretch(graph, pos):.3f}"
+    )
+
+    start_time = time.time()
+    pos = grid_spring_layout(graph, iterations=iterations)
+    grid_seconds = time.time() - start_time
+    print(
+        f"  grid:        {grid_seconds:8.2f}s  "
+        f"edge stretch {get_edge_stretch(graph, pos):.3f}"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import typer
+from deltalake import DeltaTable
+
+from ampere.common import (
+    DeltaTableWriteMode,
+    DeltaWriteConfig,
+    get_model_primary_key,
+    write_delta_batches,
+)
+from ampere.get_pypi_downloads import (
+    compact_pypi_download_batches,
+    read_pypi_download_dimension_ids,
+)
+from ampere.models import PyPIDownload, PyPIDownloadFact
+
+app = typer.Typer()
+
+
+@app.command()
+def compact(batch_size: int = 1_000_000, dry_run: bool = True) -> None:
+    """
+    one-off migration of the row-per-string `pypi_downloads` table into
+    `pypi_download_facts` and `pypi_download_dimensions`
+    """
+    bronze_path = Path(__file__).parents[1] / "data" / "bronze"
+    source_table = DeltaTable(bronze_path / PyPIDownload.__tablename__)
+    target_path = bronze_path / PyPIDownloadFact.__tablename__
+
+    n_source_records = source_table.to_pyarrow_dataset().count_rows()
+    print(f"compacting {n_source_records} records from {source_table.table_uri}")
+    if dry_run:
+        return
+
+    if (target_path / "_delta_log").exists():
+        raise ValueError(f"{target_path} already exists - exiting to avoid duplicates")
+
+    write_config = DeltaWriteConfig(
+        table_dir="bronze",
+        table_name=PyPIDownloadFact.__tablename__,  # pyright: ignore [reportArgumentType]
+        pks=get_model_primary_key(PyPIDownloadFact),
+        mode=DeltaTableWriteMode.APPEND,
+    )
+    batches = source_table.to_pyarrow_dataset().to_batches(batch_size=batch_size)
+    n_records = write_delta_batches(
+        compact_pypi_download_batches(batches, read_pypi_download_dimension_ids()),
+        write_config,
+    )
+
+    if n_records != n_source_records:
+        raise ValueError(f"expected {n_source_records} records, wrote {n_records}")
+
+    print(
+        "done - `pypi_downloads` is no longer written to and can be removed once "
+        "`stg_pypi_downloads` has been rebuilt from the compact tables"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -36,10 +36,44 @@ create or replace view followers as
 select *
 from delta_scan("data/bronze/followers");
 
-create or replace view pypi_downloads as
+create or replace view pypi_download_facts as
+select *
+from delta_scan("data/bronze/pypi_download_facts");
+
+create or replace view pypi_download_dimensions as
 select *
-from delta_scan("data/bronze/pypi_downloads");
+from delta_scan("data/bronze/pypi_download_dimensions");
+
+-- downloads are stored compactly as facts + dimensions and rehydrated here
+create or replace view pypi_downloads as
+select
+    f.project,
+    f.timestamp,
+    d.country_code,
+    d.package_version,
+    d.python_version,
+    d.system_distro_name,
+    d.system_distro_version,
+    d.system_name,
+    d.system_release,
+    f.download_count,
+    f.retrieved_at
+from pypi_download_facts as f
+inner join pypi_download_dimensions as d
+    on f.dimension_id = d.dimension_id;
 
 create or replace view pypi_download_queries as
 select *
-from delta_scan("data/bronze/pypi_download_queries");
\ No newline at end of file
+from delta_scan("data/bronze/pypi_download_queries");
+
+create or replace view pypi_download_query_chunks as
+select *
+from delta_scan("data/bronze/pypi_download_query_chunks");
+
+create or replace view delta_table_versions as
+select *
+from delta_scan("data/bronze/delta_table_versions");
+
+create or replace view dbt_model_timings as
+select *
+from delta_scan("data/bronze/dbt_model_timings");
@@ -0,0 +1,138 @@
+import datetime
+
+import pyarrow as pa
+import pytest
+
+from ampere import get_pypi_downloads
+from ampere.common import get_current_time
+from ampere.get_pypi_downloads import QueryStats, stream_pypi_downloads_from_bigquery
+from ampere.models import PyPIQueryConfig
+
+
+class FakeRows:
+    def __init__(self, batches: list[pa.RecordBatch]):
+        self.batches = batches
+
+    def to_arrow_iterable(self):
+        yield from self.batches
+
+
+class FakeRowsWithStats(FakeRows):
+    total_bytes_processed = 1024
+
+
+class FakeQueryJob:
+    total_bytes_processed = 2048
+
+
+class FakeClient:
+    def __init__(self, rows: FakeRows):
+        self.rows = rows
+        self.queries: list[str] = []
+
+    def query_and_wait(self, cmd: str) -> FakeRows:
+        self.queries.append(cmd)
+        return self.rows
+
+    def query(self, cmd: str, job_config=None) -> FakeQueryJob:
+        self.queries.append(cmd)
+        return FakeQueryJob()
+
+
+def get_batches() -> list[pa.RecordBatch]:
+    return [
+        pa.RecordBatch.from_pydict({"project": ["ampere"], "download_count": [i]})
+        for i in range(3)
+    ]
+
+
+def test_stream_without_bytes_processed():
+    client = FakeClient(FakeRows(get_batches()))
+    query_stats = QueryStats()
+
+    batches = list(
+        stream_pypi_downloads_from_bigquery(
+            "select 1", client, use_cache=False, query_stats=query_stats
+        )
+    )
+
+    assert [i["download_count"][0].as_py() for i in batches] == [0, 1, 2]
+    assert query_stats.bytes_processed == 0
+
+
+def test_stream_replays_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_pypi_downloads, "PYPI_QUERY_CACHE_DIR", tmp_path)
+    client = FakeClient(FakeRowsWithStats(get_batches()))
+    query_stats = QueryStats()
+
+    streamed = pa.Table.from_batches(
+        stream_pypi_downloads_from_bigquery("select 1", client, query_stats=query_stats)
+    )
+    replayed = pa.Table.from_batches(
+        stream_pypi_downloads_from_bigquery("select 1", client)
+    )
+
+    assert len(client.queries) == 1
+    assert query_stats.bytes_processed == 1024
+    assert replayed.equals(streamed)
+
+
+def test_dry_run_estimates_with_injected_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_pypi_downloads, "PYPI_QUERY_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(get_pypi_downloads, "get_bytes_processed_today", lambda: 0)
+    client = FakeClient(FakeRows([]))
+    queries = [
+        PyPIQueryConfig(
+            repo=repo,
+            min_date="2024-01-01",
+            max_date="2024-01-15",
+            retrieved_at=get_current_time(),
+        )
+        for repo in ["ampere", "quinn"]
+    ]
+
+    n_records = get_pypi_downloads.refresh_all_pypi_downloads(
+        queries, dry_run=True, estimate_bytes=True, client=client
+    )
+
+    assert n_records == 0
+    assert len(client.queries) == 1
+    assert all(i.estimated_bytes == 1024 for i in queries)
+
+
+def test_over_budget_chunks_fail_the_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_pypi_downloads, "PYPI_QUERY_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(get_pypi_downloads, "get_bytes_processed_today", lambda: 0)
+    monkeypatch.setattr(get_pypi_downloads, "get_pending_pypi_queries", lambda x: x)
+    client = FakeClient(FakeRows([]))
+    queries = [
+        PyPIQueryConfig(
+            repo="ampere",
+            min_date="2024-01-01",
+            max_date="2024-01-15",
+            retrieved_at=get_current_time(),
+        )
+    ]
+
+    with pytest.raises(RuntimeError, match="1 over today's byte budget"):
+        get_pypi_downloads.refresh_all_pypi_downloads(
+            queries, dry_run=False, daily_budget_bytes=1024, client=client
+        )
+
+    assert len(client.queries) == 1
+
+
+def test_backfill_dry_run_stays_offline(monkeypatch):
+    def fail_client():
+        raise AssertionError("dry run created a bigquery client")
+
+    monkeypatch.setattr(get_pypi_downloads.bigquery, "Client", fail_client)
+
+    get_pypi_downloads.add_backfill_to_table(
+        "ampere",
+        datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2024, 2, 1, tzinfo=datetime.timezone.utc),
+        max_days_per_chunk=15,
+        dry_run=True,
+        target_bytes_per_query=50 * 1024**3,
+    )